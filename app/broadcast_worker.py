@@ -0,0 +1,144 @@
+"""
+Фоновый исполнитель заданий рассылки.
+
+Задания и снимок аудитории хранятся в PostgreSQL (broadcast_jobs,
+broadcast_recipients). Результат по каждому получателю сохраняется
+пачками раз в BROADCAST_CHECKPOINT_INTERVAL секунд, поэтому после
+перезапуска задание продолжается с места остановки. При штатной
+остановке последняя пачка записывается до выхода. Задание арендуется
+исполнителем на BROADCAST_LEASE секунд, аренда продлевается каждым сохранением
+прогресса. Другой экземпляр бота (или перезапущенный процесс) заберёт
+задание в статусе running, только когда аренда истечёт. Пользователи,
+заблокировавшие бота или удалившие аккаунт, отмечаются в users
+как неактивные и не попадают в следующие рассылки.
+"""
+from __future__ import annotations
+
+import asyncio, logging, os, socket
+
+from aiogram import Bot
+
+from . import config, models, known_users
+from .broadcaster import Broadcaster, BLOCKED, NOT_FOUND, PERMANENT, SENT
+
+log = logging.getLogger(__name__)
+
+_wake = asyncio.Event()
+
+# Имя исполнителя в broadcast_jobs.locked_by
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def wake() -> None:
+    """Разбудить исполнитель (новое задание или снятие с паузы)."""
+    _wake.set()
+
+
+async def run(bot: Bot) -> None:
+    """Бесконечный цикл: берёт задания по одному и выполняет их."""
+    log.info("Broadcast worker started")
+    while True:
+        try:
+            job = await models.next_broadcast_job(OWNER, config.BROADCAST_LEASE)
+            if job:
+                await _process(bot, job)
+                continue
+        except Exception:
+            log.exception("Broadcast worker iteration failed")
+
+        _wake.clear()
+        try:
+            await asyncio.wait_for(_wake.wait(), config.BROADCAST_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _process(bot: Bot, job) -> None:
+    """Выполняет одно задание с периодическим сохранением прогресса."""
+    job_id = job["id"]
+    log.info("Broadcast #%d started (sent=%d of %d)", job_id, job["sent"], job["total"])
+
+    results: list[tuple[int, str]] = []
+
+    def on_result(chat_id: int, result: str) -> None:
+        results.append((chat_id, result))
+
+    broadcaster = Broadcaster(bot, on_result=on_result)
+
+    async def checkpoint() -> None:
+        nonlocal results
+        batch, results = results, []
+        dead = [(uid, r) for uid, r in batch if r in PERMANENT]
+        try:
+            if dead:
+                await models.mark_users_inactive([d[0] for d in dead], [d[1] for d in dead])
+                known_users.discard(d[0] for d in dead)
+            status = await models.checkpoint_broadcast(
+                job_id, [b[0] for b in batch], [_rcpt_status(b[1]) for b in batch],
+                OWNER, config.BROADCAST_LEASE,
+            )
+        except Exception:
+            results = batch + results  # запишем при следующей попытке
+            raise
+        if status is None:
+            log.warning("Broadcast #%d lease was taken over by another worker, stopping", job_id)
+            broadcaster.stop()
+        elif status != "running":
+            log.info("Broadcast #%d is %s, stopping", job_id, status)
+            broadcaster.stop()
+
+    async def checkpoint_loop() -> None:
+        while True:
+            await asyncio.sleep(config.BROADCAST_CHECKPOINT_INTERVAL)
+            try:
+                await checkpoint()
+            except Exception:
+                log.exception("Broadcast #%d checkpoint failed", job_id)
+
+    recipients = models.iter_pending_recipients(job_id)
+    saver = asyncio.create_task(checkpoint_loop())
+    done = None
+    try:
+        try:
+            await broadcaster.run(recipients, job["text"], job["photo"])
+        finally:
+            saver.cancel()
+            await recipients.aclose()
+            await asyncio.shield(checkpoint())
+        if not broadcaster.stopped:
+            done = await models.finish_broadcast_job(job_id, OWNER)
+    finally:
+        if done is None:
+            # остановка, пауза/отмена после последнего сохранения или ошибка:
+            # задание сразу доступно другому исполнителю (или после /bc_resume)
+            try:
+                await asyncio.shield(models.release_broadcast_job(job_id, OWNER))
+            except Exception:
+                log.exception("Cannot release lease of broadcast #%d", job_id)
+
+    if done is None:
+        return
+    reasons = broadcaster.stats.reasons
+    log.info(
+        "Broadcast #%d finished: sent=%d, failed=%d, reasons=%s",
+        job_id, done["sent"], done["failed"], dict(reasons),
+    )
+    try:
+        await bot.send_message(
+            done["author_id"],
+            f"✅ Рассылка #{job_id} завершена.\n"
+            f"Отправлено: {done['sent']}\nНе доставлено: {done['failed']}\n"
+            f"Из них заблокировали бота: {reasons[BLOCKED]}, "
+            f"чат не найден: {reasons[NOT_FOUND]}",
+        )
+    except Exception as e:
+        log.error("Cannot notify author of broadcast #%d: %s", job_id, e)
+
+
+def _rcpt_status(result: str) -> int:
+    """Результат отправки → статус получателя в broadcast_recipients."""
+    if result == SENT:
+        return models.RCPT_SENT
+    if result in PERMANENT:
+        return models.RCPT_DEAD
+    return models.RCPT_FAILED
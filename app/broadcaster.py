@@ -0,0 +1,206 @@
+"""
+Движок рассылки.
+
+Сообщения отправляются параллельно ограниченным числом воркеров.
+Общую скорость держит token bucket, отдельный лимитер следит
+за интервалом между сообщениями в один чат. TelegramRetryAfter
+ставит на паузу весь поток, а сообщение отправляется повторно —
+сколько угодно раз, пока рассылку не остановят (тогда получатель
+остаётся неотправленным, см. DEFERRED).
+Каждая неудача классифицируется (см. classify), чтобы «мёртвые»
+чаты можно было исключить из следующих рассылок.
+"""
+from __future__ import annotations
+
+import asyncio, logging, time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Callable, Iterable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from . import config, metrics
+
+log = logging.getLogger(__name__)
+
+# Результаты отправки одного сообщения
+SENT        = "sent"
+BLOCKED     = "blocked"      # бот заблокирован или аккаунт удалён
+NOT_FOUND   = "not_found"    # чат не существует
+TRANSIENT   = "transient"    # сеть, 5xx и прочие временные ошибки
+DEFERRED    = "deferred"     # не отправлено: рассылку остановили во время ожидания flood control
+
+# Чаты, писать в которые больше нет смысла
+PERMANENT = frozenset({BLOCKED, NOT_FOUND})
+
+
+def classify(exc: Exception) -> str:
+    """Причина неудачной отправки по исключению aiogram."""
+    if isinstance(exc, TelegramForbiddenError):
+        return BLOCKED
+    if isinstance(exc, TelegramBadRequest) and "chat not found" in exc.message.lower():
+        return NOT_FOUND
+    return TRANSIENT
+
+
+class TokenBucket:
+    """Глобальный ограничитель: rate токенов в секунду, не больше capacity подряд."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Останавливает выдачу токенов на seconds секунд (например, по RetryAfter)."""
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            self._updated = until  # после паузы ведро наполняется с нуля
+            self._tokens = 0
+
+    async def acquire(self) -> None:
+        """Ждёт свободный токен. Ожидающие обслуживаются по очереди."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ChatLimiter:
+    """Минимальный интервал между сообщениями в один и тот же чат."""
+
+    def __init__(self, interval: float, max_size: int = 10_000):
+        self.interval = interval
+        self.max_size = max_size
+        self._next: dict[int, float] = {}
+
+    async def wait(self, chat_id: int) -> None:
+        now = time.monotonic()
+        at = self._next.get(chat_id, 0.0)
+        self._next[chat_id] = max(now, at) + self.interval
+        if len(self._next) > self.max_size:
+            # выбрасываем чаты, для которых интервал уже истёк
+            self._next = {k: v for k, v in self._next.items() if v > now}
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+@dataclass
+class BroadcastStats:
+    """Итоги рассылки."""
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    reasons: Counter = field(default_factory=Counter)  # причина → число неудач
+
+
+class Broadcaster:
+    """Параллельная рассылка с общим лимитом скорости."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        rate: float | None = None,
+        workers: int | None = None,
+        chat_interval: float | None = None,
+        on_result: Callable[[int, str], None] | None = None,
+    ):
+        self.bot = bot
+        self.workers = workers or config.BROADCAST_WORKERS
+        self.bucket = TokenBucket(rate or config.BROADCAST_RATE)
+        self.chats = ChatLimiter(
+            config.BROADCAST_CHAT_INTERVAL if chat_interval is None else chat_interval
+        )
+        self.stats = BroadcastStats()
+        self.on_result = on_result
+        self._stopped = asyncio.Event()
+
+    def stop(self) -> None:
+        """Прекращает рассылку: неотправленные сообщения остаются в очереди задания."""
+        self._stopped.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped.is_set()
+
+    async def send(self, chat_id: int, text: str, photo: str | None = None) -> str:
+        """
+        Отправляет одно сообщение с учётом лимитов и возвращает результат (SENT, BLOCKED, ...).
+        RetryAfter не считается ошибкой: поток ждёт и пробует снова, пока рассылку
+        не остановят. Тогда результат — DEFERRED, и ошибкой он тоже не считается.
+        """
+        while not self.stopped:
+            await self.bucket.acquire()
+            await self.chats.wait(chat_id)
+            try:
+                if photo:
+                    await self.bot.send_photo(chat_id, photo, caption=text)
+                else:
+                    await self.bot.send_message(chat_id, text)
+                return SENT
+            except TelegramRetryAfter as e:
+                log.warning("Flood control, pausing broadcast for %s s", e.retry_after)
+                self.bucket.pause(e.retry_after)
+                self.stats.retried += 1
+            except Exception as e:
+                log.debug("Broadcast to %s failed: %s", chat_id, e)
+                return classify(e)
+        return DEFERRED
+
+    async def run(
+        self,
+        chat_ids: Iterable[int] | AsyncIterable[int],
+        text: str,
+        photo: str | None = None,
+    ) -> BroadcastStats:
+        """Рассылает сообщение всем chat_ids и возвращает статистику."""
+        queue: asyncio.Queue[int | None] = asyncio.Queue(maxsize=self.workers * 2)
+
+        async def worker() -> None:
+            while (chat_id := await queue.get()) is not None:
+                if self.stopped:
+                    continue  # дочитываем очередь, ничего не отправляя
+                result = await self.send(chat_id, text, photo)
+                metrics.BROADCAST_MESSAGES.inc(result)
+                if result == DEFERRED:
+                    continue  # получатель остаётся в очереди задания
+                if result == SENT:
+                    self.stats.sent += 1
+                else:
+                    self.stats.failed += 1
+                    self.stats.reasons[result] += 1
+                if self.on_result:
+                    self.on_result(chat_id, result)
+
+        tasks = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        try:
+            if isinstance(chat_ids, AsyncIterable):
+                async for chat_id in chat_ids:
+                    if self.stopped:
+                        break
+                    await queue.put(chat_id)
+            else:
+                for chat_id in chat_ids:
+                    if self.stopped:
+                        break
+                    await queue.put(chat_id)
+            for _ in tasks:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+        return self.stats
@@ -0,0 +1,196 @@
+"""
+Кэш каталога в памяти процесса.
+
+Таблица phones маленькая и меняется редко, поэтому телефоны в наличии
+загружаются целиком один раз, а шаги мастера отвечают из памяти.
+Триггер на phones шлёт NOTIFY в канал phones_changed, и снимок
+перечитывается в фоне. Если слушающее соединение отвалилось, снимок
+считается устаревшим через CATALOG_TTL секунд и перечитывается
+при следующем обращении (заодно переподключается слушатель).
+"""
+from __future__ import annotations
+
+import asyncio, logging, time
+
+import asyncpg
+
+from . import config, db
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "phones_changed"
+
+LOAD_QUERY = db.query("catalog_snapshot", """
+    SELECT *
+    FROM phones
+    WHERE quantity > 0
+    ORDER BY sort_idx DESC, price
+""")
+
+
+class Snapshot:
+    """
+    Неизменяемый снимок телефонов в наличии с готовым индексом
+    модель → объём → цвет → телефон. Списки уже упорядочены так же,
+    как их упорядочивали SQL-запросы, поэтому на шагах мастера
+    остаются только обращения к словарям.
+    """
+
+    def __init__(self, rows: list, version: int):
+        self.rows = rows          # в порядке sort_idx DESC, price
+        self.version = version    # растёт при каждой перезагрузке
+        self.loaded_at = time.monotonic()
+
+        best: dict[str, int] = {}
+        storages: dict[str, set] = {}
+        colors: dict[tuple, set] = {}
+        self.by_attrs: dict[tuple, object] = {}   # (model, storage, color) → телефон
+        self.by_id: dict[int, object] = {}
+        for p in rows:
+            model, storage, color = p["model"], p["storage"], p["color"]
+            best.setdefault(model, p["sort_idx"] or 0)  # строки идут по sort_idx DESC
+            storages.setdefault(model, set()).add(storage)
+            colors.setdefault((model, storage), set()).add(color)
+            self.by_attrs.setdefault((model, storage, color), p)
+            self.by_id[p["id"]] = p
+
+        # ORDER BY MAX(sort_idx) DESC, model
+        self.models: list[str] = sorted(best, key=lambda m: (-best[m], m))
+        # ORDER BY storage / ORDER BY color
+        self.storages: dict[str, list] = {
+            m: sorted(v, key=_nulls_last) for m, v in storages.items()
+        }
+        self.colors: dict[tuple, list] = {
+            k: sorted(v, key=_nulls_last) for k, v in colors.items()
+        }
+
+    def storages_for(self, model: str) -> list:
+        return self.storages.get(model, [])
+
+    def colors_for(self, model: str, storage: int) -> list:
+        return self.colors.get((model, storage), [])
+
+    def phone(self, model: str, storage: int, color: str):
+        """Телефон в наличии по тройке атрибутов или None."""
+        return self.by_attrs.get((model, storage, color))
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at
+
+
+def _nulls_last(v):
+    """Ключ сортировки как в PostgreSQL: NULL после остальных значений."""
+    return (v is None, v)
+
+
+_snapshot: Snapshot | None = None
+_listener: asyncpg.Connection | None = None
+_dirty = False
+_reload_task: asyncio.Task | None = None
+_lock = asyncio.Lock()
+
+
+async def start() -> None:
+    """Подключает слушателя NOTIFY и загружает первый снимок."""
+    await _listen()
+    await reload()
+
+
+async def stop() -> None:
+    """Закрывает слушающее соединение."""
+    global _listener
+    if _reload_task:
+        _reload_task.cancel()
+    if _listener and not _listener.is_closed():
+        await _listener.close()
+    _listener = None
+
+
+async def get() -> Snapshot:
+    """
+    Текущий снимок каталога. В штатном режиме — без обращения к БД.
+    Если БД недоступна, отдаёт последний загруженный снимок.
+    """
+    if _stale():
+        try:
+            await _refresh()
+        except Exception:
+            if _snapshot is None:
+                raise
+            log.exception("Catalog refresh failed, serving stale snapshot")
+    return _snapshot
+
+
+async def reload() -> None:
+    """Перечитывает телефоны в наличии из БД."""
+    global _snapshot
+    rows = await db.fetch(LOAD_QUERY)
+    version = _snapshot.version + 1 if _snapshot else 1
+    _snapshot = Snapshot(list(rows), version)
+    log.info("Catalog snapshot v%d loaded: %d phones", version, len(rows))
+
+
+def _listening() -> bool:
+    return _listener is not None and not _listener.is_closed()
+
+
+def _stale() -> bool:
+    """Нужно ли перечитать снимок прямо сейчас, не дожидаясь фона."""
+    if _snapshot is None:
+        return True
+    if _dirty and (_reload_task is None or _reload_task.done()):
+        return True  # фоновая перезагрузка не удалась
+    return not _listening() and _snapshot.age > config.CATALOG_TTL
+
+
+async def _refresh() -> None:
+    """Синхронная перезагрузка по запросу (первый вызов, TTL, неудачный фон)."""
+    global _dirty
+    async with _lock:
+        if not _stale():
+            return  # пока ждали блокировку, снимок уже обновили
+        if not _listening():
+            try:
+                await _listen()
+            except Exception as e:
+                log.warning("Catalog listener reconnect failed: %s", e)
+        _dirty = False
+        try:
+            await reload()
+        except Exception:
+            _dirty = True
+            raise
+
+
+async def _listen() -> None:
+    global _listener
+    _listener = await asyncpg.connect(dsn=config.DATABASE_URL)
+    await _listener.add_listener(CHANNEL, _on_notify)
+    _listener.add_termination_listener(_on_terminate)
+    log.info("Listening for %s notifications", CHANNEL)
+
+
+def _on_notify(conn, pid, channel, payload) -> None:
+    """Каталог изменился — перечитываем в фоне, шаги мастера не ждут."""
+    global _dirty, _reload_task
+    _dirty = True
+    if _reload_task is None or _reload_task.done():
+        _reload_task = asyncio.create_task(_background_reload())
+
+
+def _on_terminate(conn) -> None:
+    log.warning("Catalog listener connection lost, falling back to TTL=%ss", config.CATALOG_TTL)
+
+
+async def _background_reload() -> None:
+    global _dirty
+    # повторяем, пока во время загрузки приходят новые уведомления
+    while _dirty:
+        _dirty = False
+        try:
+            await reload()
+        except Exception:
+            _dirty = True
+            log.exception("Catalog reload failed")
+            return
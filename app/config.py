@@ -18,3 +18,137 @@ MANAGER_CONTACT = (
     f"📞 *Менеджер*: {os.getenv('MANAGER_PHONE')}\n"
     f"✉️ {os.getenv('MANAGER_USERNAME')}"
 )
+
+# Рассылка: потолок сообщений в секунду (Telegram допускает ~30/с),
+# число параллельных воркеров и минимальный интервал между сообщениями в один чат.
+# Сообщение, упёршееся в flood control, повторяется до успеха (или остановки рассылки)
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+BROADCAST_CHAT_INTERVAL = float(os.getenv("BROADCAST_CHAT_INTERVAL", "1.0"))
+
+# Фоновые задания рассылки: как часто искать новые задания
+# и как часто сохранять прогресс по получателям (секунды)
+BROADCAST_POLL_INTERVAL = float(os.getenv("BROADCAST_POLL_INTERVAL", "5"))
+BROADCAST_CHECKPOINT_INTERVAL = float(os.getenv("BROADCAST_CHECKPOINT_INTERVAL", "1"))
+# На сколько секунд исполнитель арендует задание; аренда продлевается при каждом
+# сохранении прогресса, после истечения задание может забрать другой экземпляр
+BROADCAST_LEASE = float(os.getenv("BROADCAST_LEASE", "60"))
+
+# Кэш каталога: через сколько секунд перечитывать снимок,
+# если соединение для LISTEN/NOTIFY потеряно
+CATALOG_TTL = float(os.getenv("CATALOG_TTL", "60"))
+
+# Сколько готовых inline-клавиатур держать в памяти (LRU)
+KB_CACHE_SIZE = int(os.getenv("KB_CACHE_SIZE", "512"))
+
+# Сколько телефонов показывать на одной странице полного каталога
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "8"))
+
+# Применять миграции схемы при старте бота (иначе: python -m app.migrate)
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1") == "1"
+
+# Пул соединений PostgreSQL
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# Через сколько секунд простоя закрывать лишние соединения (0 — никогда)
+DB_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_LIFETIME", "300"))
+# Таймаут одного запроса, секунды
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "10"))
+
+# Отложенная запись пользователей/интересов: период сброса (мс)
+# и размер буфера, при котором сброс происходит немедленно
+WRITER_FLUSH_MS = int(os.getenv("WRITER_FLUSH_MS", "200"))
+WRITER_MAX_ROWS = int(os.getenv("WRITER_MAX_ROWS", "500"))
+
+# Кэш известных пользователей: максимум id в памяти (8 байт на id)
+# и сколько новых id копить перед слиянием в отсортированный массив
+KNOWN_USERS_LIMIT = int(os.getenv("KNOWN_USERS_LIMIT", "5000000"))
+KNOWN_USERS_MERGE_AT = int(os.getenv("KNOWN_USERS_MERGE_AT", "10000"))
+
+# Режим получения апдейтов: polling или webhook
+RUN_MODE = os.getenv("RUN_MODE", "polling")
+# Выбросить апдейты, накопившиеся пока бот был выключен
+DROP_PENDING_UPDATES = os.getenv("DROP_PENDING_UPDATES", "0") == "1"
+
+# Webhook: публичный адрес, путь, секрет (заголовок X-Telegram-Bot-Api-Secret-Token)
+# и адрес, который слушает встроенный HTTP-сервер
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+
+# Хранилище состояний FSM: memory (один процесс) или postgres (переживает рестарт,
+# общее для реплик). Записи старше FSM_TTL секунд считаются пустыми.
+FSM_STORAGE = os.getenv("FSM_STORAGE", "memory")
+FSM_TTL = float(os.getenv("FSM_TTL", "86400"))
+# Локальный кэш чтений поверх postgres-хранилища (0 — выключен).
+# Включать, только если апдейты одного пользователя всегда идут в один процесс.
+FSM_LOCAL_CACHE_TTL = float(os.getenv("FSM_LOCAL_CACHE_TTL", "0"))
+FSM_LOCAL_CACHE_SIZE = int(os.getenv("FSM_LOCAL_CACHE_SIZE", "10000"))
+
+# Многопроцессный режим: число процессов-обработчиков (1 — всё в одном процессе)
+# и общий бюджет соединений с БД, который делится между ними поровну
+WORKERS = int(os.getenv("WORKERS", "1"))
+DB_POOL_BUDGET = int(os.getenv("DB_POOL_BUDGET", "20"))
+# Сколько раз в минуту фронт перезапускает упавший воркер, прежде чем остановиться с ошибкой
+WORKER_MAX_RESTARTS = int(os.getenv("WORKER_MAX_RESTARTS", "5"))
+
+# Ограничение нажатий inline-кнопок на пользователя:
+# скорость пополнения (нажатий в секунду), запас подряд, сколько пользователей помнить
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "2"))
+THROTTLE_BURST = float(os.getenv("THROTTLE_BURST", "5"))
+THROTTLE_MAX_USERS = int(os.getenv("THROTTLE_MAX_USERS", "100000"))
+
+# Сколько сообщений помнить для пропуска правок без изменений (app/edits.py)
+EDIT_CACHE_SIZE = int(os.getenv("EDIT_CACHE_SIZE", "10000"))
+
+# Уведомления менеджеров о заказах (outbox): как часто проверять очередь,
+# сколько сообщений отправлять за раз, на сколько секунд «арендовать» взятые
+# сообщения и предел экспоненциальной задержки между попытками
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "20"))
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "60"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "600"))
+# После скольких неудачных попыток уведомление считается недоставляемым
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+
+# Резерв товара заказом: сколько секунд держать единицу до подтверждения менеджером
+# и как часто возвращать на склад просроченные резервы
+RESERVATION_TTL = float(os.getenv("RESERVATION_TTL", "1800"))
+RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", "60"))
+
+# Порт HTTP-сервера с /metrics в формате Prometheus (0 — выключен)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Логирование: общий уровень, формат (text или json),
+# уровни отдельных логгеров: LOG_LEVELS=aiogram.event=WARNING,app.db=DEBUG
+# и доля сохраняемых записей шумных логгеров (ниже WARNING): LOG_SAMPLING=app.handlers.start=0.1
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_LEVELS = {
+    k.strip(): v.strip().upper()
+    for k, v in (x.split("=", 1) for x in os.getenv("LOG_LEVELS", "").split(",") if x)
+}
+LOG_SAMPLING = {
+    k.strip(): float(v)
+    for k, v in (x.split("=", 1) for x in os.getenv("LOG_SAMPLING", "").split(",") if x)
+}
+
+# Запись входящих апдейтов в NDJSON для воспроизведения (bench/replay.py):
+# путь к файлу, .gz — со сжатием, {pid} — id процесса. Пусто — не записывать.
+RECORD_UPDATES = os.getenv("RECORD_UPDATES", "")
+
+# Диагностика event loop: период замера задержки и сколько секунд
+# loop может не отвечать, прежде чем в лог попадёт его стек
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "0.5"))
+
+# Профилирование апдейтов (/prof_on): доля по умолчанию и сколько медленных трасс хранить
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.1"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+# Быстрый режим: uvloop и orjson (pip install uvloop orjson), см. app/runtime.py.
+# Без установленных пакетов включается только то, что доступно.
+FAST_RUNTIME = os.getenv("FAST_RUNTIME", "0") == "1"
@@ -1,25 +1,64 @@
-import asyncpg, logging
+import asyncpg, logging, time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, TypeVar
+from asyncpg.prepared_stmt import PreparedStatement
 
-from . import config
+from . import config, diagnostics, metrics
 
 log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # Глобальный пул соединений с PostgreSQL
 pool: asyncpg.Pool | None = None
 
+# Реестр именованных запросов: имя → SQL.
+# Заполняется при импорте модулей (app.models, app.catalog),
+# каждый запрос готовится на каждом новом соединении пула.
+_queries: dict[str, str] = {}
+
+
+def query(name: str, sql: str) -> str:
+    """Регистрирует именованный запрос и возвращает его имя."""
+    if _queries.setdefault(name, sql) != sql:
+        raise ValueError(f"Query {name!r} is already registered with different SQL")
+    return name
+
+
+class Connection(asyncpg.Connection):
+    """Соединение пула с подготовленными запросами из реестра."""
+    prepared: dict[str, PreparedStatement]
+
 
-async def connect() -> None:
+async def _init_connection(conn: Connection) -> None:
+    """Хук пула: готовит все зарегистрированные запросы на новом соединении."""
+    conn.prepared = {name: await conn.prepare(sql) for name, sql in _queries.items()}
+
+
+async def connect(max_size: int | None = None) -> None:
     """
     Устанавливает пул соединений с базой данных.
     Результат сохраняется в глобальной переменной pool.
+    max_size переопределяет DB_POOL_MAX_SIZE (доля общего бюджета у воркера).
+    create_pool сразу открывает min_size соединений и на каждом
+    готовит запросы, поэтому первые апдейты не платят за подключение.
     """
     global pool
+    max_size = max_size or config.DB_POOL_MAX_SIZE
     pool = await asyncpg.create_pool(
         dsn=config.DATABASE_URL,
-        min_size=1,
-        max_size=10,
+        min_size=min(config.DB_POOL_MIN_SIZE, max_size),
+        max_size=max_size,
+        max_inactive_connection_lifetime=config.DB_MAX_INACTIVE_LIFETIME,
+        command_timeout=config.DB_COMMAND_TIMEOUT,
+        statement_cache_size=config.DB_STATEMENT_CACHE_SIZE,
+        connection_class=Connection,
+        init=_init_connection,
+    )
+    log.info(
+        "PostgreSQL pool ready: %d connections, %d prepared queries",
+        pool.get_size(), len(_queries),
     )
-    log.info("PostgreSQL pool ready")
 
 
 async def close() -> None:
@@ -31,3 +70,54 @@ async def close() -> None:
     if pool and not pool._closed:
         await pool.close()
         log.info("PostgreSQL pool closed")
+
+
+# ───────────── Выполнение именованных запросов ─────────────
+
+@contextmanager
+def _timed(name: str):
+    """Время выполнения запроса (без ожидания соединения) → metrics и трасса апдейта."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.DB_QUERY_SECONDS.observe(elapsed, name)
+        diagnostics.span("db", name, elapsed)
+
+
+async def _call(name: str, run: Callable[[PreparedStatement], Awaitable[T]]) -> T:
+    """
+    Выполняет run над подготовленным запросом name на соединении из пула.
+    Подготовленные явно запросы asyncpg сам не перепрепарирует: если другой
+    экземпляр бота применил миграцию и результат SELECT * / RETURNING * изменился,
+    запрос готовится на этом соединении заново и повторяется один раз.
+    """
+    async with pool.acquire() as conn:
+        with _timed(name):
+            try:
+                return await run(conn.prepared[name])
+            except asyncpg.InvalidCachedStatementError:
+                log.info("Schema changed, re-preparing query %s", name)
+                conn.prepared[name] = await conn.prepare(_queries[name])
+                return await run(conn.prepared[name])
+
+
+async def fetch(name: str, *args) -> list:
+    return await _call(name, lambda stmt: stmt.fetch(*args))
+
+
+async def fetchrow(name: str, *args):
+    return await _call(name, lambda stmt: stmt.fetchrow(*args))
+
+
+async def fetchval(name: str, *args):
+    return await _call(name, lambda stmt: stmt.fetchval(*args))
+
+
+async def execute(name: str, *args) -> str:
+    """Выполняет запрос и возвращает статус команды (например, "UPDATE 3")."""
+    async def run(stmt: PreparedStatement) -> str:
+        await stmt.fetch(*args)
+        return stmt.get_statusmsg()
+    return await _call(name, run)
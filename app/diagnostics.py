@@ -0,0 +1,138 @@
+"""
+Диагностика производительности.
+
+Задержка event loop. Фоновая задача засыпает на LOOP_LAG_INTERVAL секунд
+и меряет, насколько позже её разбудили. Это время ожидания любой задачи
+в очереди loop, оно пишется в метрику bot_loop_lag_seconds. Поток-сторож
+следит за «пульсом» этой задачи. Если loop не отвечает дольше
+LOOP_STALL_THRESHOLD, в лог попадает стек, на котором он застрял, то есть
+медленный синхронный код.
+
+Профилирование апдейтов. Включается админом (/prof_on) и для доли апдейтов
+записывает трассу: время обработчика целиком, запросы к БД (app.db)
+и вызовы Bot API по отдельности. Остаток — CPU и прочие ожидания внутри
+обработчика. Хранятся PROFILE_KEEP самых медленных трасс (/prof_top).
+В выключенном состоянии middleware не зарегистрирован вовсе.
+"""
+from __future__ import annotations
+
+import asyncio, heapq, itertools, logging, sys, threading, time, traceback
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from . import config, metrics
+
+log = logging.getLogger(__name__)
+
+LOOP_LAG = metrics.Histogram(
+    "bot_loop_lag_seconds", "Event loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+# ───────────── Задержка event loop ─────────────
+
+@dataclass
+class LoopStats:
+    last: float = 0.0        # последняя измеренная задержка, с
+    max: float = 0.0         # максимум с запуска
+    stalls: int = 0          # сколько раз сторож ловил зависание
+    heartbeat: float = field(default_factory=time.monotonic)
+
+
+loop_stats = LoopStats()
+
+
+async def monitor_loop(interval: float | None = None, stall: float | None = None) -> None:
+    """Замеряет задержку loop и держит поток-сторож; работает до отмены."""
+    interval = interval or config.LOOP_LAG_INTERVAL
+    stall = stall or config.LOOP_STALL_THRESHOLD
+    stop = threading.Event()
+    watchdog = threading.Thread(
+        target=_watchdog,
+        args=(threading.get_ident(), interval + stall, stop),
+        name="loop-watchdog",
+        daemon=True,
+    )
+    watchdog.start()
+    try:
+        while True:
+            loop_stats.heartbeat = started = time.monotonic()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.monotonic() - started - interval)
+            loop_stats.last = lag
+            loop_stats.max = max(loop_stats.max, lag)
+            LOOP_LAG.observe(lag)
+    finally:
+        stop.set()
+
+
+def _watchdog(loop_thread: int, limit: float, stop: threading.Event) -> None:
+    """Поток-сторож: если пульс loop не обновлялся дольше limit, логирует его стек."""
+    reported = None
+    while not stop.wait(limit / 4):
+        beat = loop_stats.heartbeat
+        blocked = time.monotonic() - beat
+        if blocked < limit or beat == reported:
+            continue
+        reported = beat  # одно сообщение на одно зависание
+        loop_stats.stalls += 1
+        frame = sys._current_frames().get(loop_thread)
+        stack = "".join(traceback.format_stack(frame)) if frame else "<no frame>"
+        log.warning("Event loop blocked for %.2fs, stack:\n%s", blocked, stack)
+
+
+# ───────────── Трассы апдейтов ─────────────
+
+@dataclass
+class Trace:
+    handler: str
+    total: float = 0.0
+    spans: list[tuple[str, str, float]] = field(default_factory=list)  # (db|api, имя, с)
+    # Апдейт обработан. Задачи, созданные внутри обработчика, наследуют
+    # current_trace, но их ожидания к этой трассе уже не относятся.
+    closed: bool = False
+
+    def spent(self, kind: str) -> float:
+        return sum(s[2] for s in self.spans if s[0] == kind)
+
+    def format(self) -> str:
+        db, api = self.spent("db"), self.spent("api")
+        head = (
+            f"{self.handler}: {self.total * 1000:.1f} ms "
+            f"(db {db * 1000:.1f}, api {api * 1000:.1f}, other {(self.total - db - api) * 1000:.1f})"
+        )
+        top = sorted(self.spans, key=lambda s: -s[2])[:3]
+        return head + "".join(f"\n   {k} {n}: {d * 1000:.1f} ms" for k, n, d in top)
+
+
+# Трасса текущего апдейта (None — апдейт не профилируется)
+current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+_slowest: list[tuple[float, int, Trace]] = []  # min-куча самых медленных
+_seq = itertools.count()
+
+
+def span(kind: str, name: str, seconds: float) -> None:
+    """Отметить ожидание внутри профилируемого апдейта (вызывают app.db и Bot API middleware)."""
+    trace = current_trace.get()
+    if trace is not None and not trace.closed:
+        trace.spans.append((kind, name, seconds))
+
+
+def keep(trace: Trace) -> None:
+    """Закрыть трассу и запомнить её, если она среди PROFILE_KEEP самых медленных."""
+    trace.closed = True
+    item = (trace.total, next(_seq), trace)
+    if len(_slowest) < config.PROFILE_KEEP:
+        heapq.heappush(_slowest, item)
+    else:
+        heapq.heappushpop(_slowest, item)
+
+
+def slowest() -> list[Trace]:
+    return [t for _, _, t in sorted(_slowest, reverse=True)]
+
+
+def reset() -> None:
+    _slowest.clear()
@@ -0,0 +1,135 @@
+"""
+Редактирование сообщений без лишних запросов к Bot API.
+
+Для каждого (chat_id, message_id) запоминается отпечаток последнего
+показанного текста и клавиатуры (LRU на EDIT_CACHE_SIZE сообщений).
+Правка, которая ничего не меняет, не отправляется вовсе, а ответ
+"message is not modified" считается успехом.
+
+Быстрые правки одного сообщения склеиваются: пока одна правка в пути,
+следующие только заменяют «отложенную», и после ответа Telegram
+отправляется лишь последняя из них.
+
+Все правки и удаления сообщений бота идут через этот модуль: прямой
+message.edit_text в обход него оставил бы в кэше устаревший отпечаток,
+и следующая правка с прежним содержимым была бы ошибочно пропущена.
+"""
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, Message
+
+from . import config
+
+log = logging.getLogger(__name__)
+
+_Key = tuple[int, int]
+_Fingerprint = tuple[int | None, int | None]  # (хэш текста, хэш клавиатуры)
+
+_shown: OrderedDict[_Key, _Fingerprint] = OrderedDict()
+# сообщения с правкой в пути → отложенная правка (или None)
+_inflight: dict[_Key, tuple[_Fingerprint, Callable[[], Awaitable]] | None] = {}
+
+
+def _markup_hash(markup: InlineKeyboardMarkup | None) -> int:
+    return hash(markup.model_dump_json(exclude_none=True)) if markup else 0
+
+
+def _key(msg: Message) -> _Key:
+    return msg.chat.id, msg.message_id
+
+
+def _current(msg: Message) -> _Fingerprint:
+    """Что сейчас показано; клавиатуру знаем и из самого сообщения."""
+    fp = _shown.get(_key(msg))
+    if fp is not None:
+        return fp
+    return None, _markup_hash(msg.reply_markup)
+
+
+def _remember(key: _Key, fp: _Fingerprint) -> None:
+    _shown[key] = fp
+    _shown.move_to_end(key)
+    if len(_shown) > config.EDIT_CACHE_SIZE:
+        _shown.popitem(last=False)
+
+
+def _same(shown: _Fingerprint, new: _Fingerprint) -> bool:
+    """None в новом отпечатке — эта часть не меняется."""
+    return all(n is None or n == s for s, n in zip(shown, new))
+
+
+async def _apply(msg: Message, fp: _Fingerprint, call: Callable[[], Awaitable]) -> bool:
+    key = _key(msg)
+    if key in _inflight:
+        _inflight[key] = (fp, call)  # отправится после текущей правки
+        return False
+
+    sent = False
+    error: Exception | None = None
+    _inflight[key] = None
+    try:
+        while True:
+            shown = _current(msg)
+            if not _same(shown, fp):
+                try:
+                    await call()
+                    sent = True
+                except Exception as e:
+                    if not (isinstance(e, TelegramBadRequest) and "message is not modified" in e.message):
+                        error = error or e
+                        shown = None
+                if shown is None:
+                    _shown.pop(key, None)  # правка не прошла: что показано, неизвестно
+                else:
+                    _remember(key, tuple(n if n is not None else s for s, n in zip(shown, fp)))
+            pending = _inflight[key]
+            if pending is None:
+                break
+            # отложенная правка отправляется, даже если предыдущая не удалась:
+            # её автору уже ответили False
+            fp, call = pending
+            _inflight[key] = None
+    finally:
+        _inflight.pop(key, None)
+    if error is not None:
+        raise error  # первая ошибка — вызывавшему
+    return sent
+
+
+async def edit_text(
+    msg: Message,
+    text: str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+    **kwargs,
+) -> bool:
+    """
+    message.edit_text, пропускающий правку без изменений.
+    Возвращает True, если запрос в Telegram действительно ушёл.
+    """
+    fp = (hash(text), _markup_hash(reply_markup))
+    return await _apply(msg, fp, lambda: msg.edit_text(text, reply_markup=reply_markup, **kwargs))
+
+
+async def edit_reply_markup(msg: Message, reply_markup: InlineKeyboardMarkup | None) -> bool:
+    """message.edit_reply_markup, пропускающий правку без изменений."""
+    fp = (None, _markup_hash(reply_markup))
+    return await _apply(msg, fp, lambda: msg.edit_reply_markup(reply_markup=reply_markup))
+
+
+def forget(msg: Message) -> None:
+    """Забыть отпечаток сообщения и отложенную правку (сообщение изменено или удалено иначе)."""
+    key = _key(msg)
+    _shown.pop(key, None)
+    if _inflight.get(key) is not None:
+        _inflight[key] = None
+
+
+async def delete(msg: Message) -> bool:
+    """message.delete с очисткой отпечатка."""
+    forget(msg)
+    return await msg.delete()
@@ -0,0 +1,177 @@
+"""
+Хранилище FSM в PostgreSQL.
+
+Одна строка fsm_storage на ключ (bot, chat, user, thread, destiny):
+состояние и данные в JSONB. Использует общий пул из app.db, поэтому
+состояние мастеров переживает перезапуск и доступно всем процессам бота.
+
+Записи, не менявшиеся дольше FSM_TTL секунд, считаются пустыми
+и периодически удаляются. Локальный read-through кэш (FSM_LOCAL_CACHE_TTL > 0)
+экономит чтения, но безопасен только когда апдейты одного пользователя
+всегда попадают в один процесс.
+"""
+from __future__ import annotations
+
+import asyncio, copy, json, logging, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from . import config, db
+
+log = logging.getLogger(__name__)
+
+_KEY = "bot_id, chat_id, user_id, thread_id, destiny"
+# Истёкшая запись: при записи её старые state/data не должны «воскреснуть»
+_EXPIRED = "fsm_storage.updated_at < NOW() - make_interval(secs => $6)"
+
+FSM_GET = db.query("fsm_get", f"""
+    SELECT state, data FROM fsm_storage
+    WHERE (bot_id, chat_id, user_id, thread_id, destiny) = ($1, $2, $3, $4, $5)
+      AND updated_at >= NOW() - make_interval(secs => $6)
+""")
+
+FSM_SET_STATE = db.query("fsm_set_state", f"""
+    INSERT INTO fsm_storage ({_KEY}, state) VALUES ($1, $2, $3, $4, $5, $7)
+    ON CONFLICT ({_KEY}) DO UPDATE SET
+        state = EXCLUDED.state,
+        data = CASE WHEN {_EXPIRED} THEN '{{}}'::jsonb ELSE fsm_storage.data END,
+        updated_at = NOW()
+""")
+
+FSM_SET_DATA = db.query("fsm_set_data", f"""
+    INSERT INTO fsm_storage ({_KEY}, data) VALUES ($1, $2, $3, $4, $5, $7::jsonb)
+    ON CONFLICT ({_KEY}) DO UPDATE SET
+        data = EXCLUDED.data,
+        state = CASE WHEN {_EXPIRED} THEN NULL ELSE fsm_storage.state END,
+        updated_at = NOW()
+""")
+
+FSM_UPDATE_DATA = db.query("fsm_update_data", f"""
+    INSERT INTO fsm_storage ({_KEY}, data) VALUES ($1, $2, $3, $4, $5, $7::jsonb)
+    ON CONFLICT ({_KEY}) DO UPDATE SET
+        data = CASE WHEN {_EXPIRED} THEN EXCLUDED.data ELSE fsm_storage.data || EXCLUDED.data END,
+        state = CASE WHEN {_EXPIRED} THEN NULL ELSE fsm_storage.state END,
+        updated_at = NOW()
+    RETURNING state, data
+""")
+
+FSM_EXPIRE = db.query("fsm_expire", """
+    DELETE FROM fsm_storage
+    WHERE updated_at < NOW() - make_interval(secs => $1)
+       OR (state IS NULL AND data = '{}'::jsonb)
+""")
+
+_MISSING = object()
+
+
+class PgStorage(BaseStorage):
+    """BaseStorage поверх asyncpg-пула app.db."""
+
+    def __init__(
+        self,
+        ttl: float | None = None,
+        cache_ttl: float | None = None,
+        cache_size: int | None = None,
+    ):
+        self.ttl = float(ttl or config.FSM_TTL)
+        self.cache_ttl = config.FSM_LOCAL_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.cache_size = cache_size or config.FSM_LOCAL_CACHE_SIZE
+        # ключ → (state, data, момент устаревания записи в кэше)
+        self._cache: OrderedDict[tuple, tuple[Optional[str], dict, float]] = OrderedDict()
+        self._cleanup: asyncio.Task | None = None
+
+    # ───── служебное ─────
+
+    def _args(self, key: StorageKey) -> tuple:
+        return (key.bot_id, key.chat_id, key.user_id, key.thread_id or 0, key.destiny, self.ttl)
+
+    def _cached(self, k: tuple):
+        if not self.cache_ttl:
+            return _MISSING
+        item = self._cache.get(k)
+        if item is None or item[2] < time.monotonic():
+            return _MISSING
+        return item
+
+    def _remember(self, k: tuple, state: Optional[str], data: dict) -> None:
+        if not self.cache_ttl:
+            return
+        self._cache[k] = (state, data, time.monotonic() + self.cache_ttl)
+        self._cache.move_to_end(k)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _load(self, key: StorageKey) -> tuple[Optional[str], dict]:
+        args = self._args(key)
+        item = self._cached(args)
+        if item is not _MISSING:
+            return item[0], item[1]
+        row = await db.fetchrow(FSM_GET, *args)
+        state, data = (row["state"], json.loads(row["data"])) if row else (None, {})
+        self._remember(args, state, data)
+        return state, data
+
+    # ───── BaseStorage ─────
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        args = self._args(key)
+        await db.execute(FSM_SET_STATE, *args, value)
+        item = self._cached(args)
+        if item is not _MISSING:
+            self._remember(args, value, item[1])
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(key))[0]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        args = self._args(key)
+        await db.execute(FSM_SET_DATA, *args, json.dumps(data))
+        item = self._cached(args)
+        if item is not _MISSING:
+            self._remember(args, item[0], copy.deepcopy(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return copy.deepcopy((await self._load(key))[1])
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Слияние одним запросом (jsonb ||) вместо get_data + set_data."""
+        args = self._args(key)
+        row = await db.fetchrow(FSM_UPDATE_DATA, *args, json.dumps(data))
+        merged = json.loads(row["data"])
+        self._remember(args, row["state"], merged)
+        return copy.deepcopy(merged)
+
+    async def close(self) -> None:
+        if self._cleanup:
+            self._cleanup.cancel()
+        self._cache.clear()
+
+    # ───── очистка ─────
+
+    def start_cleanup(self, interval: float = 600) -> None:
+        """Периодически удаляет устаревшие и пустые записи."""
+        self._cleanup = asyncio.create_task(self._cleanup_loop(interval))
+
+    async def _cleanup_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                status = await db.execute(FSM_EXPIRE, self.ttl)
+                log.debug("FSM cleanup: %s", status)
+            except Exception:
+                log.exception("FSM cleanup failed")
+
+
+def create() -> BaseStorage:
+    """
+    Хранилище FSM по config.FSM_STORAGE: memory или postgres.
+    Очистку postgres-хранилища запускает services.start в одном процессе (start_cleanup).
+    """
+    if config.FSM_STORAGE == "postgres":
+        return PgStorage()
+    return MemoryStorage()
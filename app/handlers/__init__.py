@@ -2,6 +2,8 @@ from .start import router as start_router
 from .catalog_wizard import router as catalog_router
 from .broadcast import router as broadcast_router
 from .photo_id import router as photo_id_router
+from .orders import router as orders_router
+from .diagnostics import router as diagnostics_router
 
 # Список всех маршрутизаторов, которые будут подключены в main.py
 routers = (
@@ -9,4 +11,6 @@ routers = (
     catalog_router,
     broadcast_router,
     photo_id_router,
+    orders_router,
+    diagnostics_router,
 )
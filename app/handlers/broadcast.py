@@ -1,13 +1,13 @@
 from __future__ import annotations
-import asyncio
 from aiogram import Router, F, types
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import InlineKeyboardButton
 
-from .. import models, keyboards, logger, config
+from .. import models, keyboards, logger, config, catalog, broadcast_worker, edits
 
-router = Router()
+router = Router(name="broadcast")
 log = logger.logging.getLogger(__name__)
 
 ADMINS = set(config.ADMIN_IDS)
@@ -39,8 +39,16 @@ async def broadcast_entry(m: types.Message, state: FSMContext):
 
 
 async def build_audience_kb(selected: list[str]) -> types.InlineKeyboardMarkup:
+    """Клавиатура для выбора целевой аудитории (из кэша, если уже строилась)."""
+    snap = await catalog.get()
+    return keyboards.cached(
+        ("aud", snap.version, frozenset(selected)),
+        lambda: _audience_kb(snap.models, selected),
+    )
+
+
+def _audience_kb(models_list: list[str], selected: list[str]) -> types.InlineKeyboardMarkup:
     """Создаёт клавиатуру для выбора целевой аудитории."""
-    models_list = await models.distinct_models()
     builder = keyboards.InlineBuilderOneColumn()
 
     builder.add(InlineKeyboardButton(text="📢 Всем", callback_data="aud:all"))
@@ -65,7 +73,7 @@ async def toggle_model(c: types.CallbackQuery, state: FSMContext):
         selected.append(model)
     await state.update_data(selected_models=selected)
     kb = await build_audience_kb(selected)
-    await c.message.edit_reply_markup(reply_markup=kb)
+    await edits.edit_reply_markup(c.message, kb)
     await c.answer()
 
 
@@ -74,8 +82,8 @@ async def choose_all(c: types.CallbackQuery, state: FSMContext):
     """Выбрана аудитория: все пользователи."""
     await state.update_data(audience="all", selected_models=[])
     await state.set_state(BC.typing_text)
-    await c.message.edit_text("📢 *Всем пользователям.*\n\n✏️ Пришлите текст рассылки:",
-                              parse_mode="Markdown")
+    await edits.edit_text(c.message, "📢 *Всем пользователям.*\n\n✏️ Пришлите текст рассылки:",
+                          parse_mode="Markdown")
     await c.answer()
 
 
@@ -90,7 +98,8 @@ async def audience_next(c: types.CallbackQuery, state: FSMContext):
     await state.update_data(audience="selected")
     await state.set_state(BC.typing_text)
     pretty = ", ".join(models_sel)
-    await c.message.edit_text(
+    await edits.edit_text(
+        c.message,
         f"📢 *Пользователям, интересовавшимся:* {pretty}\n\n"
         "✏️ Пришлите текст рассылки:",
         parse_mode="Markdown"
@@ -139,45 +148,87 @@ async def ask_confirm(msg: types.Message | types.CallbackQuery, state: FSMContex
 
 @router.callback_query(BC.confirming, F.data == "bc:send")
 async def do_broadcast(c: types.CallbackQuery, state: FSMContext):
-    """Отправляет рассылку выбранной аудитории."""
+    """Ставит рассылку в очередь фонового исполнителя."""
     data = await state.get_data()
-    await c.answer("Рассылка запущена!", show_alert=True)
     await state.clear()
 
     if data.get("audience") == "all":
-        users = await models.all_user_ids()
+        audience = None
     elif data.get("audience") == "selected":
-        users = await models.user_ids_for_models(data["selected_models"])
+        audience = data["selected_models"]
     else:
-        users = await models.user_ids_for_models([data["audience"]])
-
+        audience = [data["audience"]]
 
-    sent, failed = 0, 0
-    for uid in users:
-        try:
-            if data.get("photo"):
-                await c.bot.send_photo(uid, data["photo"], caption=data["text"])
-            else:
-                await c.bot.send_message(uid, data["text"])
-            sent += 1
-        except Exception:
-            failed += 1
-        await asyncio.sleep(0.07)  # анти-флуд
+    job_id, total = await models.create_broadcast_job(
+        c.from_user.id, data["text"], data.get("photo"), audience
+    )
+    broadcast_worker.wake()
+    await c.answer("Рассылка запущена!", show_alert=True)
 
     log.info(
-        "Broadcast by %s (%s): sent=%d, failed=%d",
+        "Broadcast #%d by %s (%s) queued: %d recipients",
+        job_id,
         c.from_user.id,
         c.from_user.username,
-        sent,
-        failed
+        total,
     )
 
-    await c.message.answer(f"✅ Рассылка завершена.\nОтправлено: {sent}\nНе доставлено: {failed}")
+    await c.message.answer(
+        f"🚀 Рассылка #{job_id} поставлена в очередь, получателей: {total}.\n"
+        f"/bc\\_pause {job_id} — пауза, /bc\\_cancel {job_id} — отмена, /bc\\_jobs — список."
+    )
 
 
 @router.callback_query(BC.confirming, F.data == "bc:cancel")
 async def bc_cancel(c: types.CallbackQuery, state: FSMContext):
     """Отмена рассылки."""
     await state.clear()
-    await c.message.edit_text("🚫 Рассылка отменена.")
+    await edits.edit_text(c.message, "🚫 Рассылка отменена.")
     await c.answer()
+
+
+
+# ───────────── Управление заданиями рассылки ─────────────
+
+JOB_ACTIONS = {
+    # команда: (новый статус, из каких статусов можно перейти)
+    "bc_pause":  ("paused",    ["pending", "running"]),
+    "bc_resume": ("pending",   ["paused"]),
+    "bc_cancel": ("cancelled", ["pending", "running", "paused"]),
+}
+
+
+@router.message(Command(*JOB_ACTIONS))
+async def job_action(m: types.Message, command: CommandObject):
+    """Пауза, продолжение или отмена задания рассылки: /bc_pause <id>."""
+    if m.from_user.id not in ADMINS:
+        return
+    if not (command.args and command.args.strip().isdigit()):
+        await m.answer(f"Укажите номер рассылки: /{command.command} <id>", parse_mode=None)
+        return
+
+    job_id = int(command.args)
+    status, allowed = JOB_ACTIONS[command.command]
+    if await models.set_broadcast_status(job_id, status, allowed):
+        log.info("Admin %s set broadcast #%d to %s", m.from_user.id, job_id, status)
+        if status == "pending":
+            broadcast_worker.wake()
+        await m.answer(f"Рассылка #{job_id}: {status}")
+    else:
+        await m.answer(f"Рассылку #{job_id} нельзя перевести в статус {status}.")
+
+
+@router.message(Command("bc_jobs"))
+async def list_jobs(m: types.Message):
+    """Последние задания рассылки с прогрессом."""
+    if m.from_user.id not in ADMINS:
+        return
+    jobs = await models.recent_broadcast_jobs()
+    if not jobs:
+        await m.answer("Рассылок ещё не было.")
+        return
+    lines = [
+        f"#{j['id']} {j['status']}: {j['sent']}+{j['failed']}/{j['total']}"
+        for j in jobs
+    ]
+    await m.answer("\n".join(lines), parse_mode=None)
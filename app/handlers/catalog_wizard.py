@@ -2,11 +2,10 @@ from __future__ import annotations
 from aiogram import Router, types, F
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-from .. import models, keyboards, config, logger
+from .. import models, keyboards, config, logger, catalog, edits, outbox, writer
 
-router = Router()
+router = Router(name="catalog_wizard")
 log = logger.logging.getLogger(__name__)
 
 MANAGERS = config.MANAGER_IDS        # список telegram-id менеджеров
@@ -31,9 +30,19 @@ async def wizard_entry(c: types.CallbackQuery, state: FSMContext) -> None:
 
 async def send_model_step(msg: types.Message, page: int) -> None:
     """Показывает клавиатуру с выбором модели (постранично)."""
-    models_list = await models.distinct_models()
-    kb, page = keyboards.paged_kb(models_list, page, prefix="model")
-    await msg.edit_text("📱 *Выберите модель:*", reply_markup=kb)
+    snap = await catalog.get()
+    kb, page = keyboards.cached(
+        ("model", snap.version, page),
+        lambda: keyboards.paged_kb(snap.models, page, prefix="model"),
+    )
+    await edits.edit_text(msg, "📱 *Выберите модель:*", reply_markup=kb)
+
+
+@router.callback_query(Catalog.choosing_model, F.data.startswith("page:model:"))
+async def models_page(c: types.CallbackQuery) -> None:
+    """Листание списка моделей."""
+    await send_model_step(c.message, page=int(c.data.rsplit(":", 1)[1]))
+    await c.answer()
 
 
 @router.callback_query(
@@ -51,9 +60,12 @@ async def model_chosen(c: types.CallbackQuery, state: FSMContext) -> None:
 
 async def send_storage_step(msg: types.Message, model: str) -> None:
     """Показывает клавиатуру с доступными объёмами памяти."""
-    sizes = await models.distinct_storages(model)
-    kb = keyboards.simple_kb(sizes, prefix="storage", back_cb="back:models")
-    await msg.edit_text(f"💾 *Память для {model}:*", reply_markup=kb)
+    snap = await catalog.get()
+    kb = keyboards.cached(
+        ("storage", snap.version, model),
+        lambda: keyboards.simple_kb(snap.storages_for(model), prefix="storage", back_cb="back:models"),
+    )
+    await edits.edit_text(msg, f"💾 *Память для {model}:*", reply_markup=kb)
 
 
 @router.callback_query(
@@ -72,12 +84,15 @@ async def storage_chosen(c: types.CallbackQuery, state: FSMContext) -> None:
 
 async def send_color_step(msg: types.Message, model: str, storage: int) -> None:
     """Показывает клавиатуру с доступными цветами."""
-    colors = await models.distinct_colors(model, storage)
-    kb = keyboards.simple_kb(colors, prefix="color", back_cb="back:storages")
+    snap = await catalog.get()
+    kb = keyboards.cached(
+        ("color", snap.version, model, storage),
+        lambda: keyboards.simple_kb(snap.colors_for(model, storage), prefix="color", back_cb="back:storages"),
+    )
     if msg.text:
-        await msg.edit_text(f"🎨 *Цвет* {storage} GB, {model}:", reply_markup=kb)
+        await edits.edit_text(msg, f"🎨 *Цвет* {storage} GB, {model}:", reply_markup=kb)
     else:
-        await msg.delete()
+        await edits.delete(msg)
         await msg.answer(f"🎨 *Цвет* {storage} GB, {model}:", reply_markup=kb, parse_mode="Markdown")
 
 
@@ -86,10 +101,17 @@ async def send_color_step(msg: types.Message, model: str, storage: int) -> None:
     F.data.startswith("color:")
 )
 async def color_chosen(c: types.CallbackQuery, state: FSMContext) -> None:
-    """Показывает карточку товара и кнопки подтверждения."""
+    """
+    Показывает карточку товара и кнопки подтверждения.
+    Просмотр карточки — интерес к телефону (user_phones, аудитория рассылок по моделям).
+    """
     color = c.data.split(":", 1)[1]
     data = await state.update_data(color=color)
-    phone = await models.get_phone_by_attrs(**data)
+    snap = await catalog.get()
+    phone = snap.phone(data["model"], data["storage"], color)
+    if phone is None:  # успел закончиться — берём из БД, как раньше
+        phone = await models.get_phone_by_attrs(**data)
+    writer.add_user_phone(c.from_user.id, phone["id"])
 
     await keyboards.send_product_card(
         c.message,
@@ -104,47 +126,30 @@ async def color_chosen(c: types.CallbackQuery, state: FSMContext) -> None:
 
 @router.callback_query(Catalog.confirming_buy, F.data.startswith("buy:"))
 async def buy_confirmed(c: types.CallbackQuery, state: FSMContext):
-    """Обработка нажатия кнопки «Этот хочу» и уведомление менеджеров."""
+    """
+    Обработка нажатия кнопки «Этот хочу».
+    Резерв товара, заказ и уведомления менеджерам записываются одним запросом,
+    доставку выполняет app.outbox в фоне.
+    """
     phone_id = int(c.data.split(":", 1)[1])
-    phone = await models.get_phone(phone_id)
+    user = c.from_user
+    order_id = await models.create_order(user.id, user.full_name, phone_id, MANAGERS)
+    if order_id is None:
+        await c.answer("😔 Этот телефон уже раскупили.", show_alert=True)
+        return
+    outbox.wake()
+    log.info("Order #%d by %s queued for managers %s", order_id, user.id, MANAGERS)
 
-    await c.message.delete()
+    await edits.delete(c.message)
 
     final_text = (
-        "✅ Спасибо! Наш менеджер скоро свяжется с вами.\n"
+        "✅ Спасибо! Телефон зарезервирован за вами, "
+        "наш менеджер скоро свяжется с вами.\n"
         f"{config.MANAGER_CONTACT}"
     )
     await c.message.answer(final_text, parse_mode="Markdown")
     await c.answer("Заказ принят!", show_alert=True)
 
-    log.info("Notifying managers: %s", config.MANAGER_IDS)
-
-    user = c.from_user
-    notify_text = (
-        "🛒 *Новый заказ!*\n"
-        f"Имя: {user.full_name}\n"
-        f"ID: `{user.id}`\n"
-        f"Модель: {phone['model']}, {phone['storage']} GB, {phone['color']}"
-    )
-    kb = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(
-                text="✉️ Написать клиенту",
-                url=f"tg://user?id={user.id}"
-            )
-        ]
-    ])
-    for mgr_id in config.MANAGER_IDS:
-        try:
-            await c.bot.send_message(
-                mgr_id,
-                notify_text,
-                parse_mode="Markdown",
-                reply_markup=kb,
-            )
-        except Exception as e:
-            log.error("Cannot notify manager %s: %s", mgr_id, e)
-
     await state.clear()
 
 
@@ -155,7 +160,7 @@ async def back_to_colors(c: types.CallbackQuery, state: FSMContext):
     await state.set_state(Catalog.choosing_color)
     msg = c.message
     if msg.photo:
-        await msg.delete()
+        await edits.delete(msg)
         msg = await c.message.answer("⏳")  # «пустышка», далее заменим через edit_text
     await send_color_step(msg, data["model"], data["storage"])
     await c.answer()
@@ -183,8 +188,21 @@ async def show_full_catalog(c: types.CallbackQuery, state: FSMContext) -> None:
     """Показать весь каталог без мастера выбора."""
     await state.clear()
     kb = await keyboards.catalog_kb()
-    await c.message.edit_text(
+    await edits.edit_text(
+        c.message,
         "Вот что у нас есть сейчас:",
         reply_markup=kb,
     )
-    await c.answer()
\ No newline at end of file
+    await c.answer()
+
+
+@router.callback_query(F.data.startswith("cat:"))
+async def full_catalog_page(c: types.CallbackQuery) -> None:
+    """Листание полного каталога: cat:n:<id> — вперёд, cat:p:<id> — назад."""
+    _, direction, pid = c.data.split(":")
+    if direction == "n":
+        kb = await keyboards.catalog_kb(after=int(pid))
+    else:
+        kb = await keyboards.catalog_kb(before=int(pid))
+    await edits.edit_reply_markup(c.message, kb)
+    await c.answer()
@@ -0,0 +1,66 @@
+from aiogram import Router, types
+from aiogram.filters import Command, CommandObject
+
+from .. import config, diagnostics, logger
+from ..middlewares import profiling
+
+router = Router(name="diagnostics")
+log = logger.logging.getLogger(__name__)
+
+ADMINS = set(config.ADMIN_IDS)
+
+MESSAGE_LIMIT = 4096  # предел длины сообщения Telegram
+TRACE_LIMIT = 600     # сколько символов одной трассы показывать в /prof_top
+
+
+def _chunks(lines: list[str], limit: int = MESSAGE_LIMIT) -> list[str]:
+    """Склеивает строки через перевод строки в сообщения не длиннее limit."""
+    chunks, current = [], ""
+    for line in lines:
+        line = line[:limit]
+        if current and len(current) + 1 + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@router.message(Command("prof_on", "prof_off", "prof_top", "loop"))
+async def diagnostics_cmd(m: types.Message, command: CommandObject) -> None:
+    """
+    /prof_on [доля] — профилировать долю апдейтов (по умолчанию PROFILE_SAMPLE_RATE);
+    /prof_off — выключить; /prof_top — самые медленные трассы; /loop — задержка event loop.
+    Действует на процесс, который обрабатывает апдейты этого админа.
+    """
+    if m.from_user.id not in ADMINS:
+        return
+
+    if command.command == "prof_on":
+        try:
+            rate = float(command.args) if command.args else None
+        except ValueError:
+            await m.answer("Использование: /prof_on [доля от 0 до 1]", parse_mode=None)
+            return
+        diagnostics.reset()
+        profiling.enable(rate)
+        text = f"Профилирование включено: {profiling.enabled():.0%} апдейтов."
+    elif command.command == "prof_off":
+        profiling.disable()
+        text = "Профилирование выключено."
+    elif command.command == "prof_top":
+        # трассы многострочные, их бывает PROFILE_KEEP штук — режем и делим на сообщения
+        traces = [t.format()[:TRACE_LIMIT] for t in diagnostics.slowest()]
+        text = "\n".join(traces) if traces else "Трасс пока нет."
+    else:
+        s = diagnostics.loop_stats
+        text = (
+            f"Задержка loop: сейчас {s.last * 1000:.1f} ms, максимум {s.max * 1000:.1f} ms\n"
+            f"Зависаний: {s.stalls}\n"
+            f"Профилирование: {profiling.enabled():.0%}"
+        )
+    log.info("Admin %s: /%s", m.from_user.id, command.command)
+    for chunk in _chunks(text.split("\n")):
+        await m.answer(chunk, parse_mode=None)
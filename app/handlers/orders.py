@@ -0,0 +1,32 @@
+from aiogram import Router, F, types
+from aiogram.types import InlineKeyboardMarkup
+
+from .. import models, logger, config, edits
+
+router = Router(name="orders")
+log = logger.logging.getLogger(__name__)
+
+MANAGERS = set(config.MANAGER_IDS)
+
+
+@router.callback_query(F.data.startswith("ord:"))
+async def order_action(c: types.CallbackQuery) -> None:
+    """Кнопки менеджера под уведомлением о заказе: подтвердить или отменить резерв."""
+    if c.from_user.id not in MANAGERS:
+        await c.answer()
+        return
+    _, action, order_id = c.data.split(":")
+    order_id = int(order_id)
+
+    if action == "ok":
+        done = await models.confirm_order(order_id) is not None
+        result = "✅ Заказ подтверждён." if done else "Заказ уже не в резерве."
+    else:
+        done = await models.cancel_order(order_id)
+        result = "❌ Заказ отменён, товар возвращён на склад." if done else "Заказ уже не в резерве."
+    log.info("Manager %s: order #%d %s -> %s", c.from_user.id, order_id, action, done)
+
+    # Оставляем только «Написать клиенту»: повторно нажимать больше нечего
+    keep = c.message.reply_markup.inline_keyboard[:1] if c.message.reply_markup else []
+    await edits.edit_reply_markup(c.message, InlineKeyboardMarkup(inline_keyboard=keep))
+    await c.answer(result, show_alert=True)
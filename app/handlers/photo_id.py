@@ -3,7 +3,7 @@ from aiogram.filters import StateFilter
 
 from .. import config, logger
 
-router = Router()
+router = Router(name="photo_id")
 ADMINS = set(config.ADMIN_IDS)
 log = logger.logging.getLogger(__name__)
 
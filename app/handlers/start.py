@@ -1,9 +1,9 @@
 from aiogram import Router, types
 from aiogram.filters import CommandStart
 
-from .. import models, keyboards, logger
+from .. import keyboards, logger, writer, known_users
 
-router = Router()
+router = Router(name="start")
 log = logger.logging.getLogger(__name__)
 
 
@@ -11,13 +11,16 @@ log = logger.logging.getLogger(__name__)
 async def cmd_start(m: types.Message) -> None:
     """
     Обрабатывает команду /start:
-    сохраняет пользователя и отправляет приветственное сообщение.
+    ставит пользователя в очередь на запись и отправляет приветственное сообщение.
+    Известных пользователей повторно не записываем.
     """
-    await models.save_user(
-        tg_id=m.from_user.id,
-        username=m.from_user.username,
-        first=m.from_user.first_name,
-    )
+    if not known_users.contains(m.from_user.id):
+        writer.save_user(
+            tg_id=m.from_user.id,
+            username=m.from_user.username,
+            first=m.from_user.first_name,
+        )
+        known_users.add(m.from_user.id)
     log.info("User %s pressed /start", m.from_user.id)
 
     await m.answer(
@@ -1,19 +1,59 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, TypeVar
+
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message
 
-from . import models, config
+from . import models, config, edits
+
+T = TypeVar("T")
+
+# Готовые клавиатуры: ключ → результат построения, вытеснение по LRU
+_kb_cache: OrderedDict = OrderedDict()
+
+
+def cached(key: Hashable, build: Callable[[], T]) -> T:
+    """
+    Возвращает ранее построенную клавиатуру по ключу или строит и запоминает новую.
+    В ключ должно входить всё, от чего зависит разметка: версия каталога,
+    префикс, страница, выбранные элементы.
+    """
+    kb = _kb_cache.get(key)
+    if kb is not None:
+        _kb_cache.move_to_end(key)
+        return kb
+    kb = _kb_cache[key] = build()
+    if len(_kb_cache) > config.KB_CACHE_SIZE:
+        _kb_cache.popitem(last=False)
+    return kb
 
 
-async def catalog_kb() -> InlineKeyboardMarkup:
-    """Создаёт inline-клавиатуру с актуальными моделями iPhone."""
+async def catalog_kb(after: int | None = None, before: int | None = None) -> InlineKeyboardMarkup:
+    """
+    Создаёт inline-клавиатуру с одной страницей актуальных моделей iPhone.
+    Навигация: cat:p:<id первой кнопки> и cat:n:<id последней кнопки>.
+    """
+    phones, has_prev, has_next = await models.catalog_page(
+        after=after, before=before, limit=config.CATALOG_PAGE_SIZE,
+    )
+    if not phones and (after is not None or before is not None):
+        return await catalog_kb()  # опорный телефон закончился — начинаем сначала
     kb = InlineKeyboardBuilder()
-    for p in await models.get_catalog():
+    for p in phones:
         kb.add(
             InlineKeyboardButton(
                 text = f"{p['model']} — ₽ {p['price']:,}",
                 callback_data = f"prod:{p['id']}",
             )
         )
+
+    nav = []
+    if phones and has_prev:
+        nav.append(InlineKeyboardButton(text="◀", callback_data=f"cat:p:{phones[0]['id']}"))
+    if phones and has_next:
+        nav.append(InlineKeyboardButton(text="▶", callback_data=f"cat:n:{phones[-1]['id']}"))
+    if nav:
+        kb.row(*nav)
     return kb.as_markup()
 
 
@@ -98,7 +138,7 @@ async def send_product_card(
         await msg.answer(caption, reply_markup=kb, parse_mode="Markdown")
 
     if delete_prev:
-        await msg.delete()
+        await edits.delete(msg)
 
 
 class InlineBuilderOneColumn(InlineKeyboardBuilder):
@@ -0,0 +1,188 @@
+"""
+Множество telegram_id, уже сохранённых в users.
+
+Повторный /start от известного пользователя не трогает БД вовсе.
+Основное хранилище — отсортированный array('q') (поиск бисекцией),
+свежие id копятся в небольшом set и периодически вливаются в массив.
+
+Память на 1 000 000 пользователей:
+  * array('q')       — 8 МБ (8 байт на id), при слиянии кратковременно ×2;
+  * set новых id     — ~65 байт на id, не больше KNOWN_USERS_MERGE_AT штук;
+  * для сравнения обычный set из 1M int — ~63 МБ (33 МБ таблица + объекты int).
+Bloom-фильтр перед массивом не нужен: бисекция по 1M — ~20 сравнений.
+Число id ограничено KNOWN_USERS_LIMIT; сверх лимита пользователи просто
+идут по обычному пути через upsert.
+
+Пользователей, отмеченных неактивными (models.mark_users_inactive), нужно
+забыть во всех процессах и экземплярах бота, а не только в том, где работает
+рассылка: иначе их /start не дойдёт до БД и они останутся неактивными.
+Запрос шлёт NOTIFY в канал users_inactive, каждый процесс его слушает.
+Пока слушающее соединение потеряно, кэшу нельзя верить: contains() отвечает
+False (все /start идут в БД), а после переподключения кэш перечитывается.
+"""
+from __future__ import annotations
+
+import asyncio, bisect, heapq, logging
+from array import array
+
+import asyncpg
+
+from . import config, models
+
+log = logging.getLogger(__name__)
+
+_base = array("q")        # отсортированные id
+_recent: set[int] = set() # добавленные после последнего слияния
+_removed: set[int] = set()  # ставшие неактивными — их /start должен дойти до БД
+
+CHANNEL = "users_inactive"
+_listener: asyncpg.Connection | None = None
+_trusted = False  # кэш загружен и слушатель на связи
+_shard: tuple[int, int] | None = None
+_reconnect_task: asyncio.Task | None = None
+
+
+def contains(tg_id: int) -> bool:
+    """Известен ли пользователь (есть в users и активен)."""
+    if not _trusted:
+        return False
+    if tg_id in _recent:
+        return True
+    if tg_id in _removed:
+        return False
+    return _in_base(tg_id)
+
+
+def _in_base(tg_id: int) -> bool:
+    i = bisect.bisect_left(_base, tg_id)
+    return i < len(_base) and _base[i] == tg_id
+
+
+def add(tg_id: int) -> None:
+    """Запомнить пользователя после постановки его записи в очередь."""
+    _removed.discard(tg_id)
+    if _in_base(tg_id):
+        return  # вернулся после discard: уже в массиве, дубль при слиянии не нужен
+    if size() >= config.KNOWN_USERS_LIMIT:
+        return
+    _recent.add(tg_id)
+    if len(_recent) >= config.KNOWN_USERS_MERGE_AT:
+        _merge()
+
+
+def discard(tg_ids) -> None:
+    """Забыть пользователей (например, заблокировавших бота)."""
+    for tg_id in tg_ids:
+        _recent.discard(tg_id)
+        _removed.add(tg_id)
+    if len(_removed) >= config.KNOWN_USERS_MERGE_AT:
+        _merge()
+
+
+def size() -> int:
+    return len(_base) + len(_recent)
+
+
+def _merge() -> None:
+    """Вливает свежие id в основной массив и вычищает удалённые."""
+    global _base
+    merged = heapq.merge(_base, sorted(_recent))
+    _base = array("q", (i for i in merged if i not in _removed))
+    _recent.clear()
+    _removed.clear()
+
+
+async def start(shard: tuple[int, int] | None = None) -> None:
+    """Подписка на users_inactive и предзагрузка (см. load)."""
+    global _shard
+    _shard = shard
+    await _listen()
+    await load(shard)
+
+
+async def stop() -> None:
+    """Закрывает слушающее соединение."""
+    global _listener, _trusted
+    if _reconnect_task:
+        _reconnect_task.cancel()
+    conn, _listener, _trusted = _listener, None, False
+    if conn and not conn.is_closed():
+        await conn.close()
+
+
+def preload(ids) -> None:
+    """Кэш из готового набора id без БД и слушателя (офлайн-бенчмарки)."""
+    global _base, _trusted
+    _base = array("q", sorted(set(ids)))
+    _recent.clear()
+    _removed.clear()
+    _trusted = True
+
+
+async def load(shard: tuple[int, int] | None = None) -> None:
+    """
+    Предзагрузка активных пользователей при старте (потоком, без списка в памяти).
+    shard=(номер, всего) — только пользователи этого процесса (id % всего == номер).
+    Пользователи, добавленные или забытые во время загрузки, так и остаются
+    в _recent / _removed: они новее прочитанного снимка.
+    """
+    global _base, _trusted
+    _recent.clear()
+    _removed.clear()
+    ids = array("q")
+    stream = models.iter_all_user_ids(ordered=True)
+    try:
+        async for tg_id in stream:
+            if len(ids) >= config.KNOWN_USERS_LIMIT:
+                break
+            if shard is None or tg_id % shard[1] == shard[0]:
+                ids.append(tg_id)
+    finally:
+        await stream.aclose()  # освобождаем курсор, если вышли по лимиту
+    _base = ids
+    _trusted = _listening()
+    log.info("Known users loaded: %d ids, %.1f MB", len(_base), _base.itemsize * len(_base) / 2**20)
+
+
+def _mine(tg_id: int) -> bool:
+    return _shard is None or tg_id % _shard[1] == _shard[0]
+
+
+def _listening() -> bool:
+    return _listener is not None and not _listener.is_closed()
+
+
+async def _listen() -> None:
+    global _listener
+    _listener = await asyncpg.connect(dsn=config.DATABASE_URL)
+    await _listener.add_listener(CHANNEL, _on_notify)
+    _listener.add_termination_listener(_on_terminate)
+
+
+def _on_notify(conn, pid, channel, payload) -> None:
+    """Пользователи стали неактивными (id через запятую)."""
+    discard(i for i in map(int, payload.split(",")) if _mine(i))
+
+
+def _on_terminate(conn) -> None:
+    global _trusted, _reconnect_task
+    if conn is not _listener:
+        return  # закрыли сами (stop)
+    _trusted = False
+    log.warning("Known users listener connection lost, /start goes to the database until reconnect")
+    if _reconnect_task is None or _reconnect_task.done():
+        _reconnect_task = asyncio.create_task(_reconnect())
+
+
+async def _reconnect() -> None:
+    """Переподключает слушателя и перечитывает кэш: уведомления за это время потеряны."""
+    delay = 1.0
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            await _listen()
+            await load(_shard)
+            return
+        except Exception as e:
+            log.warning("Known users listener reconnect failed: %s", e)
+            delay = min(delay * 2, 60)
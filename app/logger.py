@@ -1,6 +1,8 @@
-import pathlib, logging
+import atexit, copy, json, pathlib, logging, queue, random
 
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+from . import config
 
 # Путь к папке и файлу логов
 LOG_DIR = pathlib.Path("logs")
@@ -11,17 +13,142 @@ LOG_FILE = LOG_DIR / "bot.log"
 FORMAT = "[%(asctime)s] %(levelname)-8s %(name)s: %(message)s"
 DATEFMT = "%Y-%m-%d %H:%M:%S"
 
+# Поток, который пишет записи из очереди в консоль и файл, и сами обработчики
+_listener: QueueListener | None = None
+_handlers: list[logging.Handler] = []
+# Обработчик процесса-воркера: записи уходят фронту (см. app/sharding.py)
+_forwarder: logging.Handler | None = None
+
+# Стандартные атрибуты LogRecord; всё остальное пришло через extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна JSON-строка; поля из extra= попадают в объект как есть."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, DATEFMT),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Как QueueHandler, но traceback остаётся в exc_text, а не вклеивается
+    в текст сообщения: JSON-формат выводит его отдельным полем.
+    Аргументы уже подставлены в msg, поэтому запись можно передать
+    и в другой процесс (если поля из extra= сериализуемы).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает лишь долю записей шумных логгеров: {имя: доля}.
+    Правило логгера действует и на дочерние. WARNING и выше не отбрасываются.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: dict[str, float] = {}  # имя логгера → доля (с учётом родителей)
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate, probe = 1.0, name
+            while probe:
+                if probe in self.rates:
+                    rate = self.rates[probe]
+                    break
+                probe = probe.rpartition(".")[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+def _install(queue_handler: QueueHandler, level: int | str | None) -> None:
+    """Единственный обработчик корневого логгера и уровни из конфига."""
+    if config.LOG_SAMPLING:
+        queue_handler.addFilter(SamplingFilter(config.LOG_SAMPLING))
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level or config.LOG_LEVEL)
+    for name, name_level in config.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(name_level)
+
+
+def setup_logging(level: int | str | None = None, records=None):
+    """
+    Настраивает логирование: консоль + файл с ротацией раз в сутки.
+
+    Логгеры только кладут запись в очередь (QueueHandler); форматирование,
+    запись в файл и ротацию выполняет отдельный поток (QueueListener),
+    поэтому event loop не ждёт диск. Формат — config.LOG_FORMAT (text/json),
+    уровни отдельных логгеров — config.LOG_LEVELS, выборка шумных — config.LOG_SAMPLING.
+
+    records — очередь фронта (multiprocessing.Queue) для процесса-воркера:
+    он только отправляет туда записи, а в консоль и файл их пишет фронт
+    (serve_records). Иначе несколько процессов открывали бы один файл
+    и мешали друг другу при ротации.
+    """
+    global _listener, _forwarder
+    if _listener is not None or _forwarder is not None:
+        return
+
+    if records is not None:
+        _forwarder = _QueueHandler(records)
+        _install(_forwarder, level)
+        return
+
+    formatter = JsonFormatter() if config.LOG_FORMAT == "json" else logging.Formatter(FORMAT, DATEFMT)
+    handlers = [
+        logging.StreamHandler(),
+        TimedRotatingFileHandler(
+            LOG_FILE, when="midnight", backupCount=7, encoding="utf-8"
+        ),
+    ]
+    for h in handlers:
+        h.setFormatter(formatter)
+
+    _handlers[:] = handlers
+
+    records = queue.SimpleQueue()
+    _install(_QueueHandler(records), level)
+
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # дописать очередь при выходе
+
 
-def setup_logging(level: int = logging.INFO):
-    """Настраивает логирование: консоль + файл с ротацией раз в сутки."""
-    logging.basicConfig(
-        level=level,
-        format=FORMAT,
-        datefmt=DATEFMT,
-        handlers=[
-            logging.StreamHandler(),
-            TimedRotatingFileHandler(
-                LOG_FILE, when="midnight", backupCount=7, encoding="utf-8"
-            ),
-        ],
-    )
+def serve_records(records) -> QueueListener:
+    """
+    Пишет записи, присланные воркерами в очередь records, в консоль и файл
+    этого процесса (вызывать после setup_logging). Остановить — .stop().
+    """
+    listener = QueueListener(records, *_handlers, respect_handler_level=True)
+    listener.start()
+    return listener
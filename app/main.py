@@ -1,37 +1,39 @@
 import asyncio
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
 
-from app import config, logger, db
-from app.handlers import routers
+from app import config, logger, metrics, migrate, runner, runtime, services, sharding
 from app.logger import setup_logging
 
 
-async def main():
+async def main(loop: str = "asyncio"):
     setup_logging()  # Настройка логирования (в файл и консоль)
+    runtime.report(loop)  # runtime.install() работал ещё без логирования
 
-    await db.connect()  # Подключение к базе данных
+    if config.AUTO_MIGRATE:
+        await migrate.run()  # Схема и индексы (app/migrations)
 
-    bot = Bot(
-        token=config.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode="Markdown") # Используем Markdown-разметку по умолчанию
-    )
-    dp = Dispatcher()
+    if config.WORKERS > 1:
+        # Апдейты принимает этот процесс, обрабатывают WORKERS дочерних
+        await sharding.run_front()
+        return
 
-    # Регистрируем все маршрутизаторы (обработчики событий)
-    for r in routers:
-        dp.include_router(r)
+    svc = await services.start()
+    # /metrics для Prometheus (METRICS_PORT=0 — выключено)
+    metrics_runner = await metrics.serve(config.METRICS_PORT) if config.METRICS_PORT else None
 
     try:
-        logger.logging.getLogger(__name__).info("Bot starting…")
-        await dp.start_polling(bot, skip_updates=True)
+        logger.logging.getLogger(__name__).info(
+            "Bot starting in %s mode (%s)…", config.RUN_MODE, runtime.describe()
+        )
+        await runner.run(svc.dp, svc.bot)  # polling или webhook, см. config.RUN_MODE
     except asyncio.CancelledError:
         # Игнорируем отмену при завершении (например, Ctrl+C)
         pass
     finally:
-        await db.close()
-        await bot.session.close()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await services.stop(svc)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    loop = runtime.install()  # uvloop, если FAST_RUNTIME=1 и он установлен
+    asyncio.run(main(loop))
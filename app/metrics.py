@@ -0,0 +1,187 @@
+"""
+Метрики в текстовом формате Prometheus.
+
+Простые Counter / Gauge / Histogram без внешних зависимостей
+и HTTP-сервер с /metrics на config.METRICS_PORT. Метрики живут
+в памяти процесса: в многопроцессном режиме каждый воркер отдаёт
+свои на METRICS_PORT + номер воркера.
+
+Что собирается:
+  * bot_handler_seconds          — обработчики по роутерам (см. middlewares.metrics);
+  * bot_db_query_seconds         — именованные запросы app.db;
+  * bot_db_pool_connections      — соединения пула: in_use / idle;
+  * bot_api_request_seconds, bot_api_errors_total — вызовы Bot API по методам;
+  * bot_broadcast_messages_total — отправленные в рассылке сообщения по результату.
+"""
+from __future__ import annotations
+
+import bisect, logging, math
+from typing import Callable, Iterable
+
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+# Границы корзин гистограмм по умолчанию, секунды
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        _registry.append(self)
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        head = f"# HELP {self.name} {self.doc}\n# TYPE {self.name} {self.kind}\n"
+        return head + "".join(line + "\n" for line in self._samples())
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик."""
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels: Iterable[str] = ()):
+        super().__init__(name, doc, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self):
+        for key, v in self._values.items():
+            yield f"{self.name}{_fmt_labels(self.labels, key)} {_fmt_value(v)}"
+
+
+class Gauge(_Metric):
+    """
+    Текущее значение. Если задан collect, значения снимаются в момент
+    запроса /metrics: collect() возвращает {значения меток: число}.
+    """
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Iterable[str] = (),
+        collect: Callable[[], dict[tuple, float]] | None = None,
+    ):
+        super().__init__(name, doc, labels)
+        self._values: dict[tuple, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labels) -> None:
+        self._values[labels] = value
+
+    def _samples(self):
+        values = self._collect() if self._collect else self._values
+        for key, v in values.items():
+            yield f"{self.name}{_fmt_labels(self.labels, key)} {_fmt_value(v)}"
+
+
+class Histogram(_Metric):
+    """Распределение длительностей по фиксированным корзинам."""
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: Iterable[str] = (), buckets=BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+        # метки → [счётчики по корзинам (+ последняя для +Inf), сумма]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def _samples(self):
+        for key, (counts, total) in self._series.items():
+            acc = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                acc += n
+                le = 'le="' + _fmt_value(bound) + '"'
+                yield f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {acc}"
+            yield f"{self.name}_sum{_fmt_labels(self.labels, key)} {_fmt_value(total)}"
+            yield f"{self.name}_count{_fmt_labels(self.labels, key)} {acc}"
+
+
+def render() -> str:
+    """Все метрики процесса в текстовом формате Prometheus."""
+    return "".join(m.render() for m in _registry)
+
+
+# ───────────── Метрики бота ─────────────
+
+HANDLER_SECONDS = Histogram(
+    "bot_handler_seconds", "Handler latency", ("router", "handler", "status"),
+)
+DB_QUERY_SECONDS = Histogram(
+    "bot_db_query_seconds", "Named query latency", ("query",),
+)
+API_REQUEST_SECONDS = Histogram(
+    "bot_api_request_seconds", "Bot API call latency", ("method",),
+)
+API_ERRORS = Counter(
+    "bot_api_errors_total", "Failed Bot API calls", ("method", "error"),
+)
+BROADCAST_MESSAGES = Counter(
+    "bot_broadcast_messages_total", "Broadcast messages by result", ("result",),
+)
+
+
+def _pool_connections() -> dict[tuple, float]:
+    from . import db  # db сам импортирует metrics
+    if db.pool is None:
+        return {}
+    idle = db.pool.get_idle_size()
+    return {("in_use",): db.pool.get_size() - idle, ("idle",): idle}
+
+
+DB_POOL = Gauge(
+    "bot_db_pool_connections", "asyncpg pool connections", ("state",), collect=_pool_connections,
+)
+
+
+# ───────────── HTTP ─────────────
+
+async def _handle(request: web.Request) -> web.Response:
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+
+async def serve(port: int, host: str = "0.0.0.0") -> web.AppRunner:
+    """Поднимает /metrics на host:port. Остановка — await runner.cleanup()."""
+    app = web.Application()
+    app.router.add_get("/metrics", _handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info("Metrics available on http://%s:%d/metrics", host, port)
+    return runner
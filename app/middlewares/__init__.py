@@ -0,0 +1,14 @@
+from .throttling import ThrottlingMiddleware
+from .metrics import HandlerMetricsMiddleware, ApiMetricsMiddleware
+from .recording import UpdateRecorder
+from .profiling import ProfilingMiddleware
+from . import profiling
+
+__all__ = (
+    "ThrottlingMiddleware",
+    "HandlerMetricsMiddleware",
+    "ApiMetricsMiddleware",
+    "UpdateRecorder",
+    "ProfilingMiddleware",
+    "profiling",
+)
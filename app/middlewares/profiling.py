@@ -0,0 +1,74 @@
+import random, time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+
+from .. import config, diagnostics, logger
+
+log = logger.logging.getLogger(__name__)
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """
+    Трасса для доли rate апдейтов: время обработчика и ожидания БД / Bot API
+    внутри него (см. app.diagnostics). Регистрируется только на время
+    профилирования — через enable() / disable().
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if random.random() >= self.rate:
+            return await handler(event, data)
+        trace = diagnostics.Trace(f"{data['event_router'].name}.{data['handler'].callback.__name__}")
+        token = diagnostics.current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            trace.total = time.perf_counter() - started
+            diagnostics.current_trace.reset(token)
+            diagnostics.keep(trace)
+
+
+_observers: list = []
+_active: ProfilingMiddleware | None = None
+
+
+def attach(dp: Dispatcher) -> None:
+    """Запомнить, куда вешать middleware при включении (вызывается при сборке диспетчера)."""
+    _observers[:] = [dp.message, dp.callback_query]
+
+
+def enabled() -> float:
+    """Текущая доля профилируемых апдейтов (0 — выключено)."""
+    return _active.rate if _active else 0.0
+
+
+def enable(rate: float | None = None) -> None:
+    global _active
+    rate = rate or config.PROFILE_SAMPLE_RATE
+    if _active:
+        _active.rate = rate
+        return
+    _active = ProfilingMiddleware(rate)
+    for observer in _observers:
+        observer.middleware.register(_active)
+    log.info("Update profiling enabled, sample rate %.3f", rate)
+
+
+def disable() -> None:
+    global _active
+    if not _active:
+        return
+    for observer in _observers:
+        observer.middleware.unregister(_active)
+    _active = None
+    log.info("Update profiling disabled")
@@ -0,0 +1,67 @@
+import asyncio, gzip, json, os, time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from .. import config, logger
+
+log = logger.logging.getLogger(__name__)
+
+
+class UpdateRecorder(BaseMiddleware):
+    """
+    Запись входящих апдейтов для воспроизведения (bench/replay.py).
+
+    Каждый апдейт — строка NDJSON {"t": unix-время, "update": {...}}.
+    Файл с суффиксом .gz пишется сжатым. Строки копятся в памяти
+    и раз в flush_interval секунд дописываются в файл в отдельном потоке,
+    так что event loop диск не ждёт. {pid} в пути заменяется на id процесса
+    (нужно при WORKERS > 1: у каждого воркера свой файл).
+    В записи есть персональные данные пользователей — включать осознанно.
+    """
+
+    def __init__(self, path: str | None = None, flush_interval: float = 1.0):
+        self.path = (path or config.RECORD_UPDATES).replace("{pid}", str(os.getpid()))
+        self.flush_interval = flush_interval
+        self._lines: list[bytes] = []
+        self._task: asyncio.Task | None = None
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        entry = {"t": time.time(), "update": event.model_dump(mode="json", exclude_none=True, by_alias=True)}
+        self._lines.append(json.dumps(entry, ensure_ascii=False).encode() + b"\n")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            log.info("Recording updates to %s", self.path)
+        return await handler(event, data)
+
+    def _write(self, chunk: bytes) -> None:
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "ab") as f:  # дописанный gzip — несколько членов, читается целиком
+            f.write(chunk)
+
+    async def flush(self) -> None:
+        if not self._lines:
+            return
+        chunk, self._lines = b"".join(self._lines), []
+        await asyncio.get_running_loop().run_in_executor(None, self._write, chunk)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("Cannot write recorded updates to %s", self.path)
+
+    async def close(self) -> None:
+        """Дописать остаток (регистрируется на shutdown диспетчера)."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
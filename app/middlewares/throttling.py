@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+from .. import config, logger
+
+log = logger.logging.getLogger(__name__)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничение частоты нажатий inline-кнопок: token bucket на пользователя.
+    Лишние нажатия получают пустой ответ c.answer() и до обработчика
+    (и до БД/edit_text) не доходят. Администраторы не ограничиваются.
+
+    Корзины хранятся в OrderedDict по времени последнего нажатия.
+    Корзина, которая успела полностью наполниться, ничем не отличается
+    от отсутствующей, поэтому такие записи удаляются с головы, а общий
+    размер ограничен max_users.
+    """
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: float | None = None,
+        max_users: int | None = None,
+    ):
+        self.rate = rate or config.THROTTLE_RATE
+        self.burst = burst or config.THROTTLE_BURST
+        self.max_users = max_users or config.THROTTLE_MAX_USERS
+        self.refill_time = self.burst / self.rate  # за сколько пустая корзина наполняется
+        self._buckets: OrderedDict[int, list[float]] = OrderedDict()  # user_id → [токены, время]
+
+    def allow(self, user_id: int) -> bool:
+        now = time.monotonic()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(user_id)
+        self._expire(now)
+
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def _expire(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            _, (_, last) = next(iter(buckets.items()))
+            if now - last < self.refill_time and len(buckets) <= self.max_users:
+                break
+            buckets.popitem(last=False)
+
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any],
+    ) -> Any:
+        user_id = event.from_user.id
+        if user_id in config.ADMIN_IDS or self.allow(user_id):
+            return await handler(event, data)
+        log.debug("Throttled callback %r from %s", event.data, user_id)
+        await event.answer()
+        return None
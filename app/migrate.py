@@ -0,0 +1,102 @@
+"""
+Версионные миграции схемы БД.
+
+Файлы app/migrations/NNNN_<имя>.sql применяются по возрастанию номера,
+каждый в своей транзакции. Применённые версии записываются в таблицу
+schema_migrations. Параллельный запуск нескольких экземпляров бота
+защищён advisory-блокировкой.
+
+Запуск вручную:  python -m app.migrate [--list]
+"""
+from __future__ import annotations
+
+import argparse, asyncio, logging, pathlib, re
+
+import asyncpg
+
+from . import config
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = pathlib.Path(__file__).with_name("migrations")
+LOCK_ID = 0x7DB0_0001  # ключ pg_advisory_lock, общий для всех экземпляров бота
+
+_FILE_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def discover() -> list[tuple[int, str, pathlib.Path]]:
+    """Все файлы миграций: (версия, имя, путь), по возрастанию версии."""
+    found = []
+    for path in MIGRATIONS_DIR.glob("*.sql"):
+        m = _FILE_RE.match(path.name)
+        if m:
+            found.append((int(m.group(1)), m.group(2), path))
+    return sorted(found)
+
+
+async def _applied(conn: asyncpg.Connection) -> set[int]:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    INTEGER     PRIMARY KEY,
+            name       TEXT        NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+        """
+    )
+    return {r["version"] for r in await conn.fetch("SELECT version FROM schema_migrations")}
+
+
+async def run(dsn: str | None = None) -> list[int]:
+    """Применяет недостающие миграции и возвращает их версии."""
+    conn = await asyncpg.connect(dsn=dsn or config.DATABASE_URL)
+    done = []
+    try:
+        await conn.execute("SELECT pg_advisory_lock($1)", LOCK_ID)
+        applied = await _applied(conn)
+        for version, name, path in discover():
+            if version in applied:
+                continue
+            async with conn.transaction():
+                await conn.execute(path.read_text(encoding="utf-8"))
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                    version, name,
+                )
+            log.info("Applied migration %04d_%s", version, name)
+            done.append(version)
+        if not done:
+            log.info("Database schema is up to date")
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", LOCK_ID)
+        await conn.close()
+    return done
+
+
+async def status(dsn: str | None = None) -> list[tuple[int, str, bool]]:
+    """Список миграций с признаком «применена»."""
+    conn = await asyncpg.connect(dsn=dsn or config.DATABASE_URL)
+    try:
+        applied = await _applied(conn)
+    finally:
+        await conn.close()
+    return [(v, name, v in applied) for v, name, _ in discover()]
+
+
+def main() -> None:
+    from .logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="Миграции схемы БД tg-devicebot")
+    parser.add_argument("--list", action="store_true", help="показать статус миграций и выйти")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.list:
+        for version, name, applied in asyncio.run(status()):
+            print(f"{'[x]' if applied else '[ ]'} {version:04d}_{name}")
+    else:
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
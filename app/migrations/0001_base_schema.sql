@@ -0,0 +1,26 @@
+-- Базовые таблицы бота. IF NOT EXISTS — для баз, созданных до появления миграций.
+
+CREATE TABLE IF NOT EXISTS users (
+    telegram_id BIGINT PRIMARY KEY,
+    username    TEXT,
+    first_name  TEXT,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS phones (
+    id       SERIAL  PRIMARY KEY,
+    model    TEXT    NOT NULL,
+    storage  INTEGER,
+    color    TEXT,
+    price    INTEGER NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    sort_idx INTEGER NOT NULL DEFAULT 0,
+    photo    TEXT      -- file_id картинки в Telegram
+);
+
+CREATE TABLE IF NOT EXISTS user_phones (
+    user_id  BIGINT      NOT NULL,  -- telegram_id
+    phone_id INTEGER     NOT NULL REFERENCES phones (id) ON DELETE CASCADE,
+    added_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, phone_id)
+);
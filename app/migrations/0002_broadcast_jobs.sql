@@ -0,0 +1,24 @@
+-- Задания рассылки и снимок аудитории (app/broadcast_worker.py)
+
+CREATE TABLE IF NOT EXISTS broadcast_jobs (
+    id          BIGSERIAL PRIMARY KEY,
+    author_id   BIGINT      NOT NULL,
+    text        TEXT        NOT NULL,
+    photo       TEXT,
+    status      TEXT        NOT NULL DEFAULT 'pending', -- pending/running/paused/cancelled/done
+    total       INTEGER     NOT NULL DEFAULT 0,
+    sent        INTEGER     NOT NULL DEFAULT 0,
+    failed      INTEGER     NOT NULL DEFAULT 0,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS broadcast_recipients (
+    job_id  BIGINT   NOT NULL REFERENCES broadcast_jobs (id) ON DELETE CASCADE,
+    user_id BIGINT   NOT NULL,
+    status  SMALLINT NOT NULL DEFAULT 0, -- 0 ожидает, 1 доставлено, 2 ошибка, 3 чат недоступен
+    PRIMARY KEY (job_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS broadcast_recipients_pending_idx
+    ON broadcast_recipients (job_id, user_id) WHERE status = 0;
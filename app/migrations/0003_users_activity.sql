@@ -0,0 +1,6 @@
+-- Пользователи, до которых рассылка больше не доходит (заблокировали бота и т.п.)
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS is_active       BOOLEAN NOT NULL DEFAULT TRUE,
+    ADD COLUMN IF NOT EXISTS inactive_reason TEXT,
+    ADD COLUMN IF NOT EXISTS inactive_since  TIMESTAMPTZ;
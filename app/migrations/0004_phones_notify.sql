@@ -0,0 +1,13 @@
+-- Уведомление об изменении каталога для кэша в app/catalog.py
+
+CREATE OR REPLACE FUNCTION notify_phones_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('phones_changed', '');
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS phones_changed ON phones;
+CREATE TRIGGER phones_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON phones
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_phones_changed();
@@ -0,0 +1,18 @@
+-- Индексы под реальные запросы из app/models.py
+
+-- get_phone_by_attrs / загрузка снимка каталога: только телефоны в наличии
+CREATE INDEX IF NOT EXISTS phones_in_stock_attrs_idx
+    ON phones (model, storage, color) WHERE quantity > 0;
+
+-- catalog_page и снимок каталога: ORDER BY sort_idx DESC, price, id
+CREATE INDEX IF NOT EXISTS phones_in_stock_order_idx
+    ON phones (sort_idx DESC, price, id) WHERE quantity > 0;
+
+-- user_ids_for_models: JOIN phones p ON p.id = up.phone_id
+-- (первичный ключ (user_id, phone_id) для поиска по phone_id не подходит)
+CREATE INDEX IF NOT EXISTS user_phones_phone_id_idx
+    ON user_phones (phone_id);
+
+-- user_ids_for_models: WHERE p.model = ANY(...)
+CREATE INDEX IF NOT EXISTS phones_model_idx
+    ON phones (model);
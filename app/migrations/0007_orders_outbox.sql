@@ -0,0 +1,28 @@
+-- Заказы и очередь уведомлений менеджерам (transactional outbox, app/outbox.py)
+
+CREATE TABLE IF NOT EXISTS orders (
+    id         BIGSERIAL   PRIMARY KEY,
+    user_id    BIGINT      NOT NULL,  -- telegram_id покупателя
+    user_name  TEXT,
+    phone_id   INTEGER     REFERENCES phones (id) ON DELETE SET NULL,
+    model      TEXT        NOT NULL,  -- копия товара на момент заказа
+    storage    INTEGER,
+    color      TEXT,
+    price      INTEGER     NOT NULL,
+    status     TEXT        NOT NULL DEFAULT 'new',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS order_outbox (
+    id              BIGSERIAL   PRIMARY KEY,
+    order_id        BIGINT      NOT NULL REFERENCES orders (id) ON DELETE CASCADE,
+    chat_id         BIGINT      NOT NULL,  -- кому отправить (менеджер)
+    attempts        INTEGER     NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_error      TEXT,
+    sent_at         TIMESTAMPTZ
+);
+
+-- неотправленные уведомления в порядке готовности
+CREATE INDEX IF NOT EXISTS order_outbox_due_idx
+    ON order_outbox (next_attempt_at) WHERE sent_at IS NULL;
@@ -0,0 +1,11 @@
+-- Резервирование товара заказом: статус reserved держит единицу на складе
+-- до reserved_until, затем confirmed (менеджером), cancelled или expired.
+
+ALTER TABLE orders
+    ADD COLUMN IF NOT EXISTS reserved_until TIMESTAMPTZ;
+
+ALTER TABLE orders ALTER COLUMN status SET DEFAULT 'reserved';
+
+-- поиск просроченных резервов
+CREATE INDEX IF NOT EXISTS orders_reserved_until_idx
+    ON orders (reserved_until) WHERE status = 'reserved';
@@ -0,0 +1,7 @@
+-- Аренда задания рассылки: кто его выполняет и до какого момента.
+-- Исполнитель продлевает аренду на каждом сохранении прогресса; задание
+-- в статусе running забирается другим экземпляром, только когда аренда истекла.
+
+ALTER TABLE broadcast_jobs
+    ADD COLUMN IF NOT EXISTS locked_by   TEXT,
+    ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ;
@@ -0,0 +1,9 @@
+-- Уведомления, которые доставить нельзя (менеджер заблокировал бота, сообщение
+-- отклонено Telegram, исчерпаны попытки): больше не отправляются, остаются для разбора.
+
+ALTER TABLE order_outbox
+    ADD COLUMN IF NOT EXISTS failed_at TIMESTAMPTZ;
+
+DROP INDEX IF EXISTS order_outbox_due_idx;
+CREATE INDEX IF NOT EXISTS order_outbox_due_idx
+    ON order_outbox (next_attempt_at) WHERE sent_at IS NULL AND failed_at IS NULL;
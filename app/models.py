@@ -1,19 +1,28 @@
-from typing import Sequence, Mapping
+from typing import AsyncGenerator, Sequence, Mapping
 
-from . import db
+from . import db, catalog, config
+
+# Сколько строк за раз читает серверный курсор
+CURSOR_BATCH = 1000
+
+
+# Все запросы регистрируются в db.query() и готовятся на каждом соединении пула
+
+SAVE_USER = db.query("save_user", """
+    INSERT INTO users (telegram_id, username, first_name)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (telegram_id) DO UPDATE
+        SET is_active = TRUE, inactive_reason = NULL, inactive_since = NULL
+        WHERE users.is_active = FALSE
+""")
 
 
 async def save_user(tg_id: int, username: str | None, first: str | None) -> None:
     """
     Добавить пользователя в таблицу users.
+    Пользователь, ранее отмеченный недоступным, снова становится активным.
     """
-    query = """
-        INSERT INTO users (telegram_id, username, first_name)
-        VALUES ($1, $2, $3)
-        ON CONFLICT (telegram_id) DO NOTHING
-    """
-    async with db.pool.acquire() as conn:
-        await conn.execute(query, tg_id, username, first)
+    await db.execute(SAVE_USER, tg_id, username, first)
 
 
 """
@@ -24,32 +33,116 @@ async def all_user_ids() -> Sequence[int]:
 """
 
 
+ALL_USER_IDS = db.query("all_user_ids", """
+    SELECT telegram_id FROM users WHERE is_active
+""")
+
+ALL_USER_IDS_ORDERED = db.query("all_user_ids_ordered", """
+    SELECT telegram_id FROM users WHERE is_active ORDER BY telegram_id
+""")
+
+
 async def all_user_ids() -> list[int]:
     """
-    Список всех Telegram ID зарегистрированных пользователей.
+    Список Telegram ID всех активных пользователей.
     """
-    rows = await db.pool.fetch("SELECT telegram_id FROM users")
+    rows = await db.fetch(ALL_USER_IDS)
     return [r["telegram_id"] for r in rows]
 
 
+async def _iter_column(name: str, *args, batch_size: int = CURSOR_BATCH) -> AsyncGenerator:
+    """
+    Построчно отдаёт первый столбец результата запроса name, читая его
+    серверным курсором порциями по batch_size. Память не зависит от размера выборки.
+    """
+    async with db.pool.acquire() as conn:
+        async with conn.transaction(readonly=True):
+            cur = await conn.prepared[name].cursor(*args)
+            while rows := await cur.fetch(batch_size):
+                for r in rows:
+                    yield r[0]
+
+
+def iter_all_user_ids(batch_size: int = CURSOR_BATCH, ordered: bool = False) -> AsyncGenerator[int, None]:
+    """Потоковая версия all_user_ids(). ordered=True — по возрастанию id."""
+    return _iter_column(ALL_USER_IDS_ORDERED if ordered else ALL_USER_IDS, batch_size=batch_size)
+
+
 async def get_catalog() -> Sequence[Mapping]:
-    """Список телефонов в наличии, отсортированный по цене."""
-    query = """
-        SELECT id, model, storage, color, price
-        FROM phones
-        WHERE quantity > 0
-        ORDER BY sort_idx DESC, price
+    """Список телефонов в наличии, отсортированный по цене (из кэша каталога)."""
+    return (await catalog.get()).rows
+
+
+_PAGE_COLS = "p.id, p.model, p.storage, p.color, p.price"
+
+CATALOG_FIRST_PAGE = db.query("catalog_first_page", f"""
+    SELECT {_PAGE_COLS}
+    FROM phones p
+    WHERE p.quantity > 0
+    ORDER BY p.sort_idx DESC, p.price, p.id
+    LIMIT $1
+""")
+
+CATALOG_PAGE_AFTER = db.query("catalog_page_after", f"""
+    SELECT {_PAGE_COLS}
+    FROM phones p, (SELECT sort_idx, price, id FROM phones WHERE id = $1) k
+    WHERE p.quantity > 0
+      AND (p.sort_idx < k.sort_idx
+           OR (p.sort_idx = k.sort_idx AND (p.price, p.id) > (k.price, k.id)))
+    ORDER BY p.sort_idx DESC, p.price, p.id
+    LIMIT $2
+""")
+
+CATALOG_PAGE_BEFORE = db.query("catalog_page_before", f"""
+    SELECT {_PAGE_COLS}
+    FROM phones p, (SELECT sort_idx, price, id FROM phones WHERE id = $1) k
+    WHERE p.quantity > 0
+      AND (p.sort_idx > k.sort_idx
+           OR (p.sort_idx = k.sort_idx AND (p.price, p.id) < (k.price, k.id)))
+    ORDER BY p.sort_idx, p.price DESC, p.id DESC
+    LIMIT $2
+""")
+
+
+async def catalog_page(
+    after: int | None = None,
+    before: int | None = None,
+    limit: int = 8,
+) -> tuple[list, bool, bool]:
     """
-    return await db.pool.fetch(query)
+    Страница каталога с keyset-пагинацией по (sort_idx DESC, price, id).
+    after/before — id крайнего телефона соседней страницы.
+    Возвращает (телефоны, есть_предыдущая, есть_следующая).
+    """
+    if before is not None:
+        rows = await db.fetch(CATALOG_PAGE_BEFORE, before, limit + 1)
+        return rows[:limit][::-1], len(rows) > limit, True
+
+    if after is not None:
+        rows = await db.fetch(CATALOG_PAGE_AFTER, after, limit + 1)
+        return rows[:limit], True, len(rows) > limit
+
+    rows = await db.fetch(CATALOG_FIRST_PAGE, limit + 1)
+    return rows[:limit], False, len(rows) > limit
+
+
+GET_PHONE = db.query("get_phone", """
+    SELECT * FROM phones WHERE id = $1
+""")
 
 
 async def get_phone(phone_id: str | int):
     """Получить телефон по ID."""
     pid = int(phone_id)
-    return await db.pool.fetchrow(
-        "SELECT * FROM phones WHERE id = $1",
-        pid,
-    )
+    return await db.fetchrow(GET_PHONE, pid)
+
+
+ADD_USER_PHONE = db.query("add_user_phone", """
+    INSERT INTO user_phones (user_id, phone_id)
+    VALUES ($1, $2)
+    ON CONFLICT (user_id, phone_id)
+    DO UPDATE SET added_at = NOW()
+""")
 
 
 async def add_user_phone(user_id: int, phone_id: str | int) -> None:
@@ -58,74 +151,433 @@ async def add_user_phone(user_id: int, phone_id: str | int) -> None:
     Повторный интерес обновит поле added_at.
     """
     pid = int(phone_id)
-    query = """
-        INSERT INTO user_phones (user_id, phone_id)
-        VALUES ($1, $2)
-        ON CONFLICT (user_id, phone_id)
-        DO UPDATE SET added_at = NOW()
-    """
-    async with db.pool.acquire() as conn:
-        await conn.execute(query, user_id, pid)
+    await db.execute(ADD_USER_PHONE, user_id, pid)
+
+
+SAVE_USERS = db.query("save_users", """
+    INSERT INTO users (telegram_id, username, first_name)
+    SELECT * FROM unnest($1::bigint[], $2::text[], $3::text[])
+    ON CONFLICT (telegram_id) DO UPDATE
+        SET is_active = TRUE, inactive_reason = NULL, inactive_since = NULL
+        WHERE users.is_active = FALSE
+""")
+
+
+async def save_users(tg_ids: list[int], usernames: list, firsts: list) -> None:
+    """Пакетная версия save_user(): одна команда на всю пачку (id должны быть уникальны)."""
+    await db.execute(SAVE_USERS, tg_ids, usernames, firsts)
+
+
+ADD_USER_PHONES = db.query("add_user_phones", """
+    INSERT INTO user_phones (user_id, phone_id, added_at)
+    SELECT * FROM unnest($1::bigint[], $2::int[], $3::timestamptz[])
+    ON CONFLICT (user_id, phone_id)
+    DO UPDATE SET added_at = EXCLUDED.added_at
+""")
+
+
+async def add_user_phones(user_ids: list[int], phone_ids: list[int], added: list) -> None:
+    """Пакетная версия add_user_phone() (пары user_id, phone_id должны быть уникальны)."""
+    await db.execute(ADD_USER_PHONES, user_ids, phone_ids, added)
 
 
 async def distinct_models() -> list[str]:
     """Уникальные модели, доступные в наличии."""
-    rows = await db.pool.fetch(
-        """
-        SELECT model
-        FROM phones
-        WHERE quantity > 0
-        GROUP BY model
-        ORDER BY MAX(sort_idx) DESC, model -- ← главное поле сортировки
-        """
-    )
-    return [r["model"] for r in rows]
+    return (await catalog.get()).models
 
 
 async def distinct_storages(model: str):
     """Доступные объёмы памяти для указанной модели."""
-    rows = await db.pool.fetch(
-        "SELECT DISTINCT storage FROM phones WHERE model=$1 AND quantity>0 ORDER BY storage",
-        model,
-    )
-    return [r["storage"] for r in rows]
+    return (await catalog.get()).storages_for(model)
 
 
 async def distinct_colors(model: str, storage: int):
     """Доступные цвета для конкретной модели и объёма памяти."""
-    rows = await db.pool.fetch(
-        """
-        SELECT DISTINCT color
-        FROM phones
-        WHERE model=$1 AND storage=$2 AND quantity>0
-        ORDER BY color
-        """,
-        model, storage,
-    )
-    return [r["color"] for r in rows]
+    return (await catalog.get()).colors_for(model, storage)
+
+
+GET_PHONE_BY_ATTRS = db.query("get_phone_by_attrs", """
+    SELECT * FROM phones
+    WHERE model=$1 AND storage=$2 AND color=$3
+    LIMIT 1
+""")
 
 
 async def get_phone_by_attrs(model: str, storage: int, color: str):
     """Получить телефон по тройке: модель, объём, цвет."""
-    return await db.pool.fetchrow(
-        """
-        SELECT * FROM phones
-        WHERE model=$1 AND storage=$2 AND color=$3
+    phone = (await catalog.get()).phone(model, storage, color)
+    if phone is not None:
+        return phone
+    # телефона нет в наличии — ищем в БД, как раньше
+    return await db.fetchrow(GET_PHONE_BY_ATTRS, model, storage, color)
+
+
+USER_IDS_FOR_MODELS = db.query("user_ids_for_models", """
+    SELECT DISTINCT up.user_id          -- это telegram_id
+    FROM user_phones up
+    JOIN phones      p ON p.id = up.phone_id
+    JOIN users       u ON u.telegram_id = up.user_id AND u.is_active
+    WHERE p.model = ANY($1::text[])
+""")
+
+
+async def user_ids_for_models(models: list[str]) -> list[int]:
+    """Получить активных пользователей, интересовавшихся любой из указанных моделей."""
+    rows = await db.fetch(USER_IDS_FOR_MODELS, models)
+    return [r["user_id"] for r in rows]
+
+
+# ───────────── Задания рассылки ─────────────
+
+# Статусы получателя в broadcast_recipients
+RCPT_PENDING, RCPT_SENT, RCPT_FAILED, RCPT_DEAD = 0, 1, 2, 3
+
+
+CREATE_JOB = db.query("create_broadcast_job", """
+    INSERT INTO broadcast_jobs (author_id, text, photo)
+    VALUES ($1, $2, $3)
+    RETURNING id
+""")
+
+SNAPSHOT_ALL = db.query("snapshot_all_users", """
+    INSERT INTO broadcast_recipients (job_id, user_id)
+    SELECT $1, telegram_id FROM users WHERE is_active
+""")
+
+SNAPSHOT_MODELS = db.query("snapshot_users_for_models", """
+    INSERT INTO broadcast_recipients (job_id, user_id)
+    SELECT DISTINCT $1::bigint, up.user_id
+    FROM user_phones up
+    JOIN phones      p ON p.id = up.phone_id
+    JOIN users       u ON u.telegram_id = up.user_id AND u.is_active
+    WHERE p.model = ANY($2::text[])
+""")
+
+SET_JOB_TOTAL = db.query("set_broadcast_total", """
+    UPDATE broadcast_jobs SET total = $2 WHERE id = $1
+""")
+
+
+async def create_broadcast_job(
+    author_id: int,
+    text: str,
+    photo: str | None,
+    models: list[str] | None = None,
+) -> tuple[int, int]:
+    """
+    Создать задание рассылки и снимок аудитории.
+    models=None — все активные пользователи, иначе интересовавшиеся указанными моделями.
+    Возвращает (id задания, число получателей).
+    """
+    async with db.pool.acquire() as conn:
+        async with conn.transaction():
+            q = conn.prepared
+            job_id = await q[CREATE_JOB].fetchval(author_id, text, photo)
+            if models is None:
+                stmt = q[SNAPSHOT_ALL]
+                await stmt.fetch(job_id)
+            else:
+                stmt = q[SNAPSHOT_MODELS]
+                await stmt.fetch(job_id, models)
+            total = int(stmt.get_statusmsg().split()[-1])  # "INSERT 0 <n>"
+            await q[SET_JOB_TOTAL].fetch(job_id, total)
+    return job_id, total
+
+
+NEXT_JOB = db.query("next_broadcast_job", """
+    UPDATE broadcast_jobs SET
+        status = 'running',
+        locked_by = $1,
+        lease_until = NOW() + make_interval(secs => $2)
+    WHERE id = (
+        SELECT id FROM broadcast_jobs
+        WHERE status IN ('running', 'pending')
+          AND (lease_until IS NULL OR lease_until < NOW())  -- никто не выполняет
+        ORDER BY status DESC, id     -- 'running' раньше 'pending'
         LIMIT 1
-        """,
-        model, storage, color,
+        FOR UPDATE SKIP LOCKED
     )
+    RETURNING *
+""")
 
 
-async def user_ids_for_models(models: list[str]) -> list[int]:
-    """Получить пользователей, интересовавшихся любой из указанных моделей."""
-    rows = await db.pool.fetch(
-        """
-        SELECT DISTINCT up.user_id          -- это telegram_id
-        FROM user_phones up
-        JOIN phones      p ON p.id = up.phone_id
-        WHERE p.model = ANY($1::text[])
-        """,
-        models,
+async def next_broadcast_job(owner: str, lease: float):
+    """
+    Взять следующее задание: сначала прерванные (running), затем новые.
+    Задание переводится в статус running и арендуется owner на lease секунд.
+    Задание с действующей арендой (его выполняет другой исполнитель) не берётся.
+    """
+    return await db.fetchrow(NEXT_JOB, owner, lease)
+
+
+RELEASE_JOB = db.query("release_broadcast_job", """
+    UPDATE broadcast_jobs SET locked_by = NULL, lease_until = NULL
+    WHERE id = $1 AND locked_by = $2
+""")
+
+
+async def release_broadcast_job(job_id: int, owner: str) -> None:
+    """Вернуть аренду задания (исполнитель остановился штатно)."""
+    await db.execute(RELEASE_JOB, job_id, owner)
+
+
+PENDING_RECIPIENTS = db.query("pending_recipients", """
+    SELECT user_id FROM broadcast_recipients
+    WHERE job_id = $1 AND status = 0 AND user_id > $2
+    ORDER BY user_id
+    LIMIT $3
+""")
+
+
+async def iter_pending_recipients(job_id: int, batch_size: int = CURSOR_BATCH) -> AsyncGenerator[int, None]:
+    """
+    Получатели задания, которым сообщение ещё не отправлялось (потоком).
+    Читаются keyset-страницами по user_id, каждая — отдельным коротким запросом:
+    рассылка идёт часами, и держать всё это время транзакцию и соединение
+    пула нельзя (незакрытая транзакция не даёт vacuum убрать старые версии
+    строк, которые плодят сохранения прогресса).
+    """
+    last = -(2 ** 63)
+    while rows := await db.fetch(PENDING_RECIPIENTS, job_id, last, batch_size):
+        for r in rows:
+            yield r[0]
+        last = rows[-1][0]
+
+
+CHECKPOINT = db.query("checkpoint_broadcast", """
+    WITH done AS (
+        UPDATE broadcast_recipients r SET status = d.status
+        FROM unnest($2::bigint[], $3::smallint[]) AS d(user_id, status)
+        WHERE r.job_id = $1 AND r.user_id = d.user_id AND r.status = 0
+        RETURNING d.status
+    )
+    UPDATE broadcast_jobs SET
+        sent   = sent   + (SELECT count(*) FROM done WHERE status = 1),
+        failed = failed + (SELECT count(*) FROM done WHERE status >= 2),
+        lease_until = NOW() + make_interval(secs => $5)
+    WHERE id = $1 AND locked_by = $4
+    RETURNING status
+""")
+
+
+async def checkpoint_broadcast(
+    job_id: int,
+    user_ids: list[int],
+    statuses: list[int],
+    owner: str,
+    lease: float,
+) -> str | None:
+    """
+    Зафиксировать результаты отправки одной пачкой, обновить счётчики задания
+    и продлить аренду owner на lease секунд.
+    Возвращает текущий статус задания (для паузы/отмены);
+    None — задание арендовано другим исполнителем.
+    """
+    return await db.fetchval(CHECKPOINT, job_id, user_ids, statuses, owner, lease)
+
+
+FINISH_JOB = db.query("finish_broadcast_job", """
+    UPDATE broadcast_jobs SET status = 'done', finished_at = NOW(), locked_by = NULL, lease_until = NULL
+    WHERE id = $1 AND status = 'running' AND locked_by = $2
+    RETURNING *
+""")
+
+
+async def finish_broadcast_job(job_id: int, owner: str):
+    """Пометить задание завершённым (если его не поставили на паузу или не отменили)."""
+    return await db.fetchrow(FINISH_JOB, job_id, owner)
+
+
+SET_JOB_STATUS = db.query("set_broadcast_status", """
+    UPDATE broadcast_jobs SET status = $2 WHERE id = $1 AND status = ANY($3::text[])
+""")
+
+
+async def set_broadcast_status(job_id: int, status: str, allowed_from: list[str]) -> bool:
+    """Сменить статус задания, если текущий статус входит в allowed_from."""
+    result = await db.execute(SET_JOB_STATUS, job_id, status, allowed_from)
+    return result != "UPDATE 0"
+
+
+RECENT_JOBS = db.query("recent_broadcast_jobs", """
+    SELECT id, status, total, sent, failed, created_at
+    FROM broadcast_jobs
+    ORDER BY id DESC
+    LIMIT $1
+""")
+
+
+async def recent_broadcast_jobs(limit: int = 10):
+    """Последние задания рассылки."""
+    return await db.fetch(RECENT_JOBS, limit)
+
+
+MARK_INACTIVE = db.query("mark_users_inactive", """
+    WITH changed AS (
+        UPDATE users u
+        SET is_active = FALSE, inactive_reason = d.reason, inactive_since = NOW()
+        FROM unnest($1::bigint[], $2::text[]) AS d(user_id, reason)
+        WHERE u.telegram_id = d.user_id AND u.is_active
+        RETURNING u.telegram_id
+    )
+    -- id через запятую, по 300 в уведомлении (предел payload — 8000 байт)
+    SELECT pg_notify('users_inactive', string_agg(telegram_id::text, ','))
+    FROM (SELECT telegram_id, (row_number() OVER ()) / 300 AS chunk FROM changed) c
+    GROUP BY chunk
+""")
+
+
+async def mark_users_inactive(user_ids: list[int], reasons: list[str]) -> None:
+    """
+    Отметить пользователей, до которых сообщения больше не доходят.
+    Процессы бота узнают об этом через NOTIFY users_inactive (см. known_users).
+    """
+    await db.execute(MARK_INACTIVE, user_ids, reasons)
+
+
+# ───────────── Заказы и уведомления менеджерам ─────────────
+
+CREATE_ORDER = db.query("create_order", """
+    WITH p AS (
+        UPDATE phones SET quantity = quantity - 1
+        WHERE id = $3 AND quantity > 0
+        RETURNING id, model, storage, color, price
+    ), o AS (
+        INSERT INTO orders (user_id, user_name, phone_id, model, storage, color, price, reserved_until)
+        SELECT $1, $2, id, model, storage, color, price, NOW() + make_interval(secs => $5) FROM p
+        RETURNING id
+    ), n AS (
+        INSERT INTO order_outbox (order_id, chat_id)
+        SELECT o.id, m FROM o, unnest($4::bigint[]) AS m
+    )
+    SELECT id FROM o
+""")
+
+
+async def create_order(
+    user_id: int,
+    user_name: str,
+    phone_id: int,
+    notify: list[int],
+    hold: float | None = None,
+) -> int | None:
+    """
+    Зарезервировать единицу товара, записать заказ и поставить уведомления
+    для notify в outbox — одним запросом (и значит, в одной транзакции).
+    Остаток уменьшается условным UPDATE ... WHERE quantity > 0: из конкурирующих
+    покупателей последнюю единицу получит ровно один. Резерв держится hold секунд.
+    None — товар закончился (или такого телефона нет).
+    """
+    hold = config.RESERVATION_TTL if hold is None else hold
+    return await db.fetchval(CREATE_ORDER, user_id, user_name, phone_id, notify, hold)
+
+
+CONFIRM_ORDER = db.query("confirm_order", """
+    UPDATE orders SET status = 'confirmed', reserved_until = NULL
+    WHERE id = $1 AND status = 'reserved'
+    RETURNING *
+""")
+
+
+async def confirm_order(order_id: int):
+    """Подтвердить резерв. None — заказ уже не в резерве (отменён, истёк, подтверждён)."""
+    return await db.fetchrow(CONFIRM_ORDER, order_id)
+
+
+# Снять резервы и вернуть товар на склад одним запросом
+_RELEASE = """
+    WITH released AS (
+        UPDATE orders SET status = $1, reserved_until = NULL
+        WHERE status = 'reserved' AND {where}
+        RETURNING id, phone_id
+    ), restock AS (
+        UPDATE phones p SET quantity = p.quantity + r.n
+        FROM (
+            SELECT phone_id, count(*) AS n FROM released
+            WHERE phone_id IS NOT NULL GROUP BY phone_id
+        ) r
+        WHERE p.id = r.phone_id
     )
-    return [r["user_id"] for r in rows]
\ No newline at end of file
+    SELECT id FROM released
+"""
+
+CANCEL_ORDER = db.query("cancel_order", _RELEASE.format(where="id = $2"))
+
+EXPIRE_RESERVATIONS = db.query("expire_reservations", _RELEASE.format(
+    where="reserved_until < NOW() AND ($2::integer IS NULL OR phone_id = $2)"
+))
+
+
+async def cancel_order(order_id: int) -> bool:
+    """Отменить резерв и вернуть товар. False — заказ уже не в резерве."""
+    return await db.fetchval(CANCEL_ORDER, "cancelled", order_id) is not None
+
+
+async def expire_reservations(phone_id: int | None = None) -> list[int]:
+    """
+    Снять просроченные резервы, вернуть товар. Возвращает id заказов.
+    phone_id — только резервы этого телефона.
+    """
+    rows = await db.fetch(EXPIRE_RESERVATIONS, "expired", phone_id)
+    return [r["id"] for r in rows]
+
+
+CLAIM_OUTBOX = db.query("claim_outbox", """
+    UPDATE order_outbox ob SET
+        attempts = attempts + 1,
+        next_attempt_at = NOW() + make_interval(secs => $2)  -- аренда на время отправки
+    FROM orders o
+    WHERE o.id = ob.order_id AND ob.id IN (
+        SELECT id FROM order_outbox
+        WHERE sent_at IS NULL AND failed_at IS NULL AND next_attempt_at <= NOW()
+        ORDER BY next_attempt_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING ob.id, ob.chat_id, ob.attempts, o.id AS order_id, o.status, o.reserved_until,
+              o.user_id, o.user_name, o.model, o.storage, o.color, o.price
+""")
+
+
+async def claim_outbox(limit: int, lease: float):
+    """
+    Взять готовые к отправке уведомления. Взятые строки откладываются на lease
+    секунд: если процесс упадёт, не успев отчитаться, их заберут повторно.
+    """
+    return await db.fetch(CLAIM_OUTBOX, limit, lease)
+
+
+OUTBOX_SENT = db.query("outbox_sent", """
+    UPDATE order_outbox SET sent_at = NOW(), last_error = NULL
+    WHERE id = ANY($1::bigint[])
+""")
+
+
+async def outbox_sent(ids: list[int]) -> None:
+    await db.execute(OUTBOX_SENT, ids)
+
+
+OUTBOX_RETRY = db.query("outbox_retry", """
+    UPDATE order_outbox ob SET
+        next_attempt_at = NOW() + make_interval(secs => d.delay),
+        last_error = d.error
+    FROM unnest($1::bigint[], $2::float8[], $3::text[]) AS d(id, delay, error)
+    WHERE ob.id = d.id
+""")
+
+
+async def outbox_retry(ids: list[int], delays: list[float], errors: list[str]) -> None:
+    """Отложить неудавшиеся уведомления на delays секунд."""
+    await db.execute(OUTBOX_RETRY, ids, delays, errors)
+
+
+OUTBOX_FAILED = db.query("outbox_failed", """
+    UPDATE order_outbox ob SET failed_at = NOW(), last_error = d.error
+    FROM unnest($1::bigint[], $2::text[]) AS d(id, error)
+    WHERE ob.id = d.id
+""")
+
+
+async def outbox_failed(ids: list[int], errors: list[str]) -> None:
+    """Больше не отправлять эти уведомления (ошибка не временная или попытки исчерпаны)."""
+    await db.execute(OUTBOX_FAILED, ids, errors)
@@ -0,0 +1,142 @@
+"""
+Доставка уведомлений о заказах менеджерам (transactional outbox).
+
+Обработчик покупки только записывает заказ и строки order_outbox одним
+запросом; отправкой занимается этот фоновый цикл. Сообщения берутся
+пачками через FOR UPDATE SKIP LOCKED и отправляются параллельно.
+Неудачные попытки повторяются с экспоненциальной задержкой (или через
+retry_after от Telegram). Уведомление, которое повтор не спасёт (менеджер
+заблокировал бота, Telegram отклонил запрос), или исчерпавшее
+OUTBOX_MAX_ATTEMPTS попыток, помечается failed_at и больше не отправляется.
+Заказ из другого процесса (WORKERS > 1) будет замечен
+не позже чем через OUTBOX_POLL_INTERVAL.
+"""
+from __future__ import annotations
+
+import asyncio, logging, re
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from . import config, models
+
+log = logging.getLogger(__name__)
+
+BASE_BACKOFF = 5  # секунд до второй попытки, дальше ×2
+
+_wake = asyncio.Event()
+
+
+def wake() -> None:
+    """Разбудить доставку (в этом процессе только что создан заказ)."""
+    _wake.set()
+
+
+def _md(value) -> str:
+    """Экранирует спецсимволы разметки Markdown (не MarkdownV2) в тексте пользователя."""
+    return re.sub(r"([_*`\[])", r"\\\1", str(value))
+
+
+def render(row) -> tuple[str, InlineKeyboardMarkup]:
+    """Текст и клавиатура уведомления по строке claim_outbox."""
+    text = (
+        f"🛒 *Новый заказ #{row['order_id']}!*\n"
+        f"Имя: {_md(row['user_name'])}\n"
+        f"ID: `{row['user_id']}`\n"
+        f"Модель: {_md(row['model'])}, {row['storage']} GB, {_md(row['color'])}"
+    )
+    rows = [
+        [
+            InlineKeyboardButton(
+                text="✉️ Написать клиенту",
+                url=f"tg://user?id={row['user_id']}"
+            )
+        ]
+    ]
+    if row["status"] == "reserved":
+        text += f"\nРезерв до {row['reserved_until']:%d.%m %H:%M %Z}"
+        rows.append(order_buttons(row["order_id"]))
+    else:
+        text += f"\nСтатус: {row['status']}"  # уведомление опоздало к концу резерва
+    return text, InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def order_buttons(order_id: int) -> list[InlineKeyboardButton]:
+    """Кнопки менеджера для резерва (обрабатываются в handlers/orders.py)."""
+    return [
+        InlineKeyboardButton(text="✅ Подтвердить", callback_data=f"ord:ok:{order_id}"),
+        InlineKeyboardButton(text="❌ Отменить", callback_data=f"ord:no:{order_id}"),
+    ]
+
+
+def permanent(attempts: int, exc: Exception) -> bool:
+    """Повторять бессмысленно: бот заблокирован, запрос отклонён или попытки исчерпаны."""
+    if isinstance(exc, (TelegramForbiddenError, TelegramBadRequest)):
+        return True
+    return attempts >= config.OUTBOX_MAX_ATTEMPTS
+
+
+def backoff(attempts: int, exc: Exception) -> float:
+    if isinstance(exc, TelegramRetryAfter):
+        return float(exc.retry_after)
+    return min(config.OUTBOX_MAX_BACKOFF, BASE_BACKOFF * 2 ** (attempts - 1))
+
+
+async def _send(bot: Bot, row) -> Exception | None:
+    text, kb = render(row)
+    try:
+        await bot.send_message(row["chat_id"], text, parse_mode="Markdown", reply_markup=kb)
+    except Exception as e:
+        return e
+    return None
+
+
+async def deliver(bot: Bot) -> int:
+    """Отправляет одну пачку готовых уведомлений. Возвращает её размер."""
+    rows = await models.claim_outbox(config.OUTBOX_BATCH, config.OUTBOX_LEASE)
+    if not rows:
+        return 0
+    errors = await asyncio.gather(*(_send(bot, r) for r in rows))
+
+    sent = [r["id"] for r, e in zip(rows, errors) if e is None]
+    failed = [(r, e) for r, e in zip(rows, errors) if e is not None]
+    dead = [(r, e) for r, e in failed if permanent(r["attempts"], e)]
+    retry = [(r, e) for r, e in failed if not permanent(r["attempts"], e)]
+    if sent:
+        await models.outbox_sent(sent)
+    if retry:
+        for r, e in retry:
+            log.warning(
+                "Order #%d: cannot notify %s (attempt %d): %s",
+                r["order_id"], r["chat_id"], r["attempts"], e,
+            )
+        await models.outbox_retry(
+            [r["id"] for r, _ in retry],
+            [backoff(r["attempts"], e) for r, e in retry],
+            [str(e) for _, e in retry],
+        )
+    if dead:
+        for r, e in dead:
+            log.error(
+                "Order #%d: giving up notifying %s after %d attempts: %s",
+                r["order_id"], r["chat_id"], r["attempts"], e,
+            )
+        await models.outbox_failed([r["id"] for r, _ in dead], [str(e) for _, e in dead])
+    return len(rows)
+
+
+async def run(bot: Bot) -> None:
+    """Бесконечный цикл доставки; между пачками ждёт wake() или OUTBOX_POLL_INTERVAL."""
+    log.info("Order outbox dispatcher started")
+    while True:
+        _wake.clear()
+        try:
+            if await deliver(bot) >= config.OUTBOX_BATCH:
+                continue  # очередь, похоже, не пуста — сразу следующую пачку
+        except Exception:
+            log.exception("Order outbox iteration failed")
+        try:
+            await asyncio.wait_for(_wake.wait(), config.OUTBOX_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,27 @@
+"""
+Снятие просроченных резервов.
+
+Заказ резервирует единицу товара на RESERVATION_TTL секунд (см. models.create_order).
+Если менеджер не подтвердил его за это время, заказ получает статус expired,
+а товар возвращается на склад. Работает в одном экземпляре (воркер 0).
+"""
+from __future__ import annotations
+
+import asyncio, logging
+
+from . import config, models
+
+log = logging.getLogger(__name__)
+
+
+async def run() -> None:
+    """Бесконечный цикл: раз в RESERVATION_SWEEP_INTERVAL секунд снимает просроченные резервы."""
+    log.info("Reservation sweeper started")
+    while True:
+        try:
+            expired = await models.expire_reservations()
+            if expired:
+                log.info("Reservations expired, stock restored: orders %s", expired)
+        except Exception:
+            log.exception("Reservation sweep failed")
+        await asyncio.sleep(config.RESERVATION_SWEEP_INTERVAL)
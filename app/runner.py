@@ -0,0 +1,66 @@
+"""
+Способы получения апдейтов: long polling или webhook.
+Режим выбирается в config.RUN_MODE.
+"""
+import asyncio, logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from . import config
+
+log = logging.getLogger(__name__)
+
+
+async def run_polling(dp: Dispatcher, bot: Bot) -> None:
+    """Long polling. Снимает webhook, если он остался от прошлого запуска."""
+    await bot.delete_webhook(drop_pending_updates=config.DROP_PENDING_UPDATES)
+    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+
+
+def build_webhook_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    """
+    aiohttp-приложение с обработчиком webhook.
+    Запросы без правильного X-Telegram-Bot-Api-Secret-Token отклоняются (401).
+    """
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=config.WEBHOOK_SECRET,
+    ).register(app, path=config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)  # startup/shutdown диспетчера вместе с приложением
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """Поднимает HTTP-сервер и регистрирует webhook в Telegram."""
+    if not (config.WEBHOOK_BASE_URL and config.WEBHOOK_SECRET):
+        raise RuntimeError("Webhook mode requires WEBHOOK_BASE_URL and WEBHOOK_SECRET")
+
+    runner = web.AppRunner(build_webhook_app(dp, bot))
+    await runner.setup()
+    site = web.TCPSite(runner, config.WEBAPP_HOST, config.WEBAPP_PORT)
+    await site.start()
+
+    url = config.WEBHOOK_BASE_URL.rstrip("/") + config.WEBHOOK_PATH
+    await bot.set_webhook(
+        url,
+        secret_token=config.WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+        drop_pending_updates=config.DROP_PENDING_UPDATES,
+    )
+    log.info("Webhook set to %s, listening on %s:%d", url, config.WEBAPP_HOST, config.WEBAPP_PORT)
+
+    try:
+        await asyncio.Event().wait()  # работаем до отмены (Ctrl+C / SIGTERM)
+    finally:
+        await runner.cleanup()
+
+
+async def run(dp: Dispatcher, bot: Bot) -> None:
+    if config.RUN_MODE == "webhook":
+        await run_webhook(dp, bot)
+    else:
+        await run_polling(dp, bot)
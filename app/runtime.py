@@ -0,0 +1,74 @@
+"""
+Быстрый режим исполнения (FAST_RUNTIME=1).
+
+  * uvloop вместо стандартного event loop asyncio;
+  * orjson для разбора ответов Bot API (в том числе getUpdates и тел webhook)
+    и сериализации клавиатур и прочих параметров запросов.
+
+Оба пакета необязательны: если какого-то нет, используется стандартная
+реализация, а в лог пишется, что именно включилось.
+"""
+from __future__ import annotations
+
+import asyncio, json, logging
+from typing import Any, Callable
+
+from aiogram.client.session.aiohttp import AiohttpSession
+
+from . import config
+
+log = logging.getLogger(__name__)
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+
+def install() -> str:
+    """
+    Ставит политику uvloop до создания event loop (вызывать до asyncio.run).
+    Возвращает название используемого loop. Сам ничего не логирует: обычно
+    логирование к этому моменту ещё не настроено, результат передаётся в report().
+    """
+    if config.FAST_RUNTIME and uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        return "uvloop"
+    return "asyncio"
+
+
+def report(loop: str) -> None:
+    """Предупредить, если быстрый режим включён, а uvloop не установлен (после setup_logging)."""
+    if config.FAST_RUNTIME and loop != "uvloop":
+        log.warning("FAST_RUNTIME is on but uvloop is not installed, using asyncio loop")
+
+
+def json_loads() -> Callable[[str | bytes], Any]:
+    return orjson.loads if config.FAST_RUNTIME and orjson is not None else json.loads
+
+
+def json_dumps() -> Callable[[Any], str]:
+    return _orjson_dumps if config.FAST_RUNTIME and orjson is not None else json.dumps
+
+
+def session(**kwargs) -> AiohttpSession:
+    """HTTP-сессия бота с JSON-кодеком текущего режима."""
+    if config.FAST_RUNTIME and orjson is None:
+        log.warning("FAST_RUNTIME is on but orjson is not installed, using json")
+    return AiohttpSession(json_loads=json_loads(), json_dumps=json_dumps(), **kwargs)
+
+
+def describe() -> str:
+    """Что включено — для логов и отчётов бенчмарка."""
+    loop = type(asyncio.get_event_loop_policy()).__module__.split(".")[0]
+    codec = "orjson" if json_loads() is not json.loads else "json"
+    return f"loop={loop}, json={codec}"
@@ -0,0 +1,104 @@
+"""
+Запуск и остановка всего, что нужно обработчикам: пул БД, кэши,
+фоновые задачи, бот и диспетчер. Используется main.py и процессами-воркерами
+из sharding.py.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+
+from . import config, db, catalog, writer, known_users, broadcast_worker, fsm_storage, outbox, reservations, diagnostics, runtime
+from .handlers import routers
+from .middlewares import ThrottlingMiddleware, HandlerMetricsMiddleware, ApiMetricsMiddleware, UpdateRecorder, profiling
+
+
+@dataclass
+class Services:
+    bot: Bot
+    dp: Dispatcher
+    tasks: list[asyncio.Task] = field(default_factory=list)
+
+
+def create_bot(session: BaseSession | None = None) -> Bot:
+    """session — своя HTTP-сессия (например, на другой сервер Bot API)."""
+    bot = Bot(
+        token=config.BOT_TOKEN,
+        session=session or runtime.session(),  # JSON-кодек по config.FAST_RUNTIME
+        default=DefaultBotProperties(parse_mode="Markdown") # Используем Markdown-разметку по умолчанию
+    )
+    bot.session.middleware(ApiMetricsMiddleware())  # время и ошибки вызовов Bot API
+    return bot
+
+
+def create_dispatcher() -> Dispatcher:
+    dp = Dispatcher(storage=fsm_storage.create())  # memory или postgres, см. config.FSM_STORAGE
+
+    if config.RECORD_UPDATES:
+        # Запись входящего трафика для bench/replay.py — самым первым, до всех фильтров
+        recorder = UpdateRecorder()
+        dp.update.outer_middleware(recorder)
+        dp.shutdown.register(recorder.close)
+
+    # Защита от «долбёжки» кнопок — до фильтров и обработчиков
+    dp.callback_query.outer_middleware(ThrottlingMiddleware())
+
+    # Время обработчиков по роутерам (внутренние middleware наследуются вложенными роутерами)
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.callback_query.middleware(HandlerMetricsMiddleware())
+    # Профилирование апдейтов включается командой /prof_on (handlers/diagnostics.py)
+    profiling.attach(dp)
+
+    # Регистрируем все маршрутизаторы (обработчики событий)
+    for r in routers:
+        dp.include_router(r)
+    return dp
+
+
+async def start(
+    *,
+    pool_size: int | None = None,
+    shard: tuple[int, int] | None = None,
+    background: bool = True,
+) -> Services:
+    """
+    pool_size  — максимальный размер пула (по умолчанию из конфига);
+    shard      — (номер, всего): процесс обслуживает только свою долю пользователей;
+    background — запускать ли фоновые задачи, которые должны работать в одном экземпляре.
+    """
+    await db.connect(max_size=pool_size)  # Подключение к базе данных
+    await catalog.start()  # Кэш каталога + подписка на изменения phones
+    writer.start()  # Отложенная запись пользователей и интересов
+    await known_users.start(shard)  # Уже сохранённые пользователи: /start без БД
+
+    services = Services(bot=create_bot(), dp=create_dispatcher())
+    # Задержка event loop и сторож зависаний — в каждом процессе
+    services.tasks.append(asyncio.create_task(diagnostics.monitor_loop()))
+
+    if background:
+        # Фоновый исполнитель рассылок (продолжает прерванные задания)
+        services.tasks.append(asyncio.create_task(broadcast_worker.run(services.bot)))
+        # Доставка уведомлений о заказах менеджерам
+        services.tasks.append(asyncio.create_task(outbox.run(services.bot)))
+        # Возврат на склад товара из просроченных резервов
+        services.tasks.append(asyncio.create_task(reservations.run()))
+        # Удаление устаревших состояний FSM (одна таблица на все процессы)
+        if isinstance(services.dp.storage, fsm_storage.PgStorage):
+            services.dp.storage.start_cleanup()
+    return services
+
+
+async def stop(services: Services) -> None:
+    for t in services.tasks:
+        t.cancel()
+    await asyncio.gather(*services.tasks, return_exceptions=True)
+    await services.dp.storage.close()
+    await catalog.stop()
+    await known_users.stop()
+    await writer.stop()  # дописываем буфер до закрытия пула
+    await db.close()
+    await services.bot.session.close()
@@ -0,0 +1,293 @@
+"""
+Многопроцессная обработка апдейтов.
+
+Фронтальный процесс получает апдейты (polling или webhook) и раскладывает
+их по WORKERS дочерним процессам по id пользователя (id % WORKERS).
+Все апдейты одного пользователя попадают в один процесс и обрабатываются
+там строго по очереди, поэтому FSM-мастера не ломаются. Апдейты разных
+пользователей внутри процесса обрабатываются конкурентно.
+
+Каждый воркер поднимает свой пул БД размером DB_POOL_BUDGET // WORKERS.
+Фоновые задачи в одном экземпляре (рассылки, уведомления о заказах)
+работают только в воркере 0. Метрики воркер N отдаёт на METRICS_PORT + N.
+
+Фронт следит за воркерами: упавший перезапускается, а апдейты из его
+очереди переходят новому процессу. Если воркер падает чаще
+WORKER_MAX_RESTARTS раз в минуту, фронт останавливается с ошибкой.
+Логи воркеры отправляют фронту, в консоль и файл пишет только он.
+"""
+from __future__ import annotations
+
+import asyncio, collections, logging, multiprocessing as mp, queue, signal, time
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from . import config, logger, metrics, runtime, services
+from .handlers import routers
+from .logger import setup_logging
+
+log = logging.getLogger(__name__)
+
+POLL_TIMEOUT = 30
+_EMPTY = object()
+
+
+def shard_key(data: dict) -> int:
+    """Id пользователя (или чата) из «сырого» апдейта."""
+    for name, event in data.items():
+        if not isinstance(event, dict):
+            continue
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+    return data.get("update_id", 0)
+
+
+def pool_share(workers: int) -> int:
+    """Размер пула одного воркера из общего бюджета соединений."""
+    return max(2, config.DB_POOL_BUDGET // workers)
+
+
+# ───────────── Воркер ─────────────
+
+def _worker_entry(index: int, total: int, inbox: mp.Queue, logs: mp.Queue) -> None:
+    """Точка входа дочернего процесса."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # останавливает фронт через очередь
+    setup_logging(records=logs)  # записи пишет фронт
+    runtime.report(runtime.install())  # spawn: политика loop не наследуется от фронта
+    asyncio.run(_worker_main(index, total, inbox))
+
+
+async def _worker_main(index: int, total: int, inbox: mp.Queue) -> None:
+    svc = await services.start(
+        pool_size=pool_share(total),
+        shard=(index, total),
+        background=index == 0,
+    )
+    bot, dp = svc.bot, svc.dp
+    # у каждого воркера свои метрики и свой порт
+    metrics_runner = await metrics.serve(config.METRICS_PORT + index) if config.METRICS_PORT else None
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+
+    # хвост очереди каждого пользователя: следующий апдейт ждёт предыдущий
+    tails: dict[int, asyncio.Task] = {}
+    loads = runtime.json_loads()
+
+    async def process(prev: asyncio.Task | None, raw: bytes) -> None:
+        if prev is not None:
+            await asyncio.wait([prev])
+        try:
+            update = Update.model_validate(loads(raw), context={"bot": bot})
+            await dp.feed_update(bot, update)
+        except Exception:
+            log.exception("Update processing failed in worker %d", index)
+
+    def submit(key: int, raw: bytes) -> None:
+        task = loop.create_task(process(tails.get(key), raw))
+        tails[key] = task
+        task.add_done_callback(lambda t: tails.pop(key) if tails.get(key) is t else None)
+
+    def receive():
+        try:
+            return inbox.get(timeout=0.5)
+        except queue.Empty:
+            return _EMPTY
+
+    await dp.emit_startup(bot=bot)
+    log.info("Worker %d/%d started", index, total)
+    try:
+        while not stop.is_set():
+            item = await loop.run_in_executor(None, receive)
+            if item is _EMPTY:
+                continue
+            if item is None:
+                break
+            submit(*item)
+        if tails:
+            await asyncio.wait(list(tails.values()))
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await services.stop(svc)
+        log.info("Worker %d/%d stopped", index, total)
+
+
+# ───────────── Фронт ─────────────
+
+class Front:
+    """Принимает апдейты и отдаёт их воркерам."""
+
+    def __init__(self, workers: int):
+        self._ctx = mp.get_context("spawn")
+        self.logs = self._ctx.Queue()  # записи логов от воркеров
+        self.queues = [self._ctx.Queue() for _ in range(workers)]
+        self.procs = [self._process(i) for i in range(workers)]
+        self._restarts = [collections.deque() for _ in range(workers)]  # время перезапусков
+        self._log_listener = None
+
+    def _process(self, index: int):
+        return self._ctx.Process(
+            target=_worker_entry,
+            args=(index, len(self.queues), self.queues[index], self.logs),
+            name=f"bot-worker-{index}",
+        )
+
+    def start(self) -> None:
+        self._log_listener = logger.serve_records(self.logs)
+        for p in self.procs:
+            p.start()
+
+    def check(self) -> None:
+        """
+        Перезапускает упавшие воркеры. RuntimeError — воркер падает
+        чаще WORKER_MAX_RESTARTS раз в минуту (например, не может подключиться к БД).
+        """
+        now = time.monotonic()
+        for i, p in enumerate(self.procs):
+            if p.is_alive():
+                continue
+            recent = self._restarts[i]
+            while recent and now - recent[0] > 60:
+                recent.popleft()
+            if len(recent) >= config.WORKER_MAX_RESTARTS:
+                raise RuntimeError(f"Worker {p.name} keeps crashing, last exit code {p.exitcode}")
+            recent.append(now)
+            moved = self._replace_queue(i)
+            log.error("Worker %s died with exit code %s, restarting (%d queued updates kept)",
+                      p.name, p.exitcode, moved)
+            self.procs[i] = self._process(i)
+            self.procs[i].start()
+
+    def _replace_queue(self, index: int) -> int:
+        """
+        Новая очередь для воркера: старую умерший процесс мог оставить
+        с захваченной блокировкой чтения. Что удаётся прочитать из старой,
+        переносится. Возвращает число перенесённых апдейтов.
+        """
+        old, new = self.queues[index], self._ctx.Queue()
+        moved = 0
+        try:
+            while True:
+                new.put(old.get_nowait())
+                moved += 1
+        except queue.Empty:
+            pass
+        self.queues[index] = new
+        old.cancel_join_thread()  # недописанное в трубу старой очереди не держит выход
+        old.close()
+        return moved
+
+    async def supervise(self, interval: float = 1.0) -> None:
+        """Проверяет воркеры раз в interval секунд; ошибка check() завершает задачу."""
+        while True:
+            await asyncio.sleep(interval)
+            self.check()
+
+    def dispatch(self, data: dict, raw: bytes) -> None:
+        key = shard_key(data)
+        self.queues[key % len(self.queues)].put((key, raw))
+
+    def stop(self, timeout: float = 30) -> None:
+        for q in self.queues:
+            q.put(None)
+        for p in self.procs:
+            p.join(timeout)
+            if p.is_alive():
+                log.warning("Worker %s did not stop in %ss, terminating", p.name, timeout)
+                p.terminate()
+        if self._log_listener:
+            self._log_listener.stop()  # дописывает оставшиеся записи воркеров
+
+
+async def _poll(front: Front, bot: Bot, allowed_updates: list[str]) -> None:
+    """Long polling во фронте: getUpdates → воркеры."""
+    await bot.delete_webhook(drop_pending_updates=config.DROP_PENDING_UPDATES)
+    offset = None
+    dumps = runtime.json_dumps()
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset, timeout=POLL_TIMEOUT, allowed_updates=allowed_updates,
+            )
+        except Exception as e:
+            log.error("getUpdates failed: %s", e)
+            await asyncio.sleep(1)
+            continue
+        for u in updates:
+            data = u.model_dump(mode="json", by_alias=True, exclude_none=True)
+            front.dispatch(data, dumps(data).encode())
+            offset = u.update_id + 1
+
+
+async def _serve_webhook(front: Front, bot: Bot, allowed_updates: list[str]) -> None:
+    """Webhook во фронте: тело запроса уходит воркеру как есть."""
+    if not (config.WEBHOOK_BASE_URL and config.WEBHOOK_SECRET):
+        raise RuntimeError("Webhook mode requires WEBHOOK_BASE_URL and WEBHOOK_SECRET")
+
+    loads = runtime.json_loads()
+
+    async def handle(request: web.Request) -> web.Response:
+        if request.headers.get("X-Telegram-Bot-Api-Secret-Token") != config.WEBHOOK_SECRET:
+            return web.Response(status=401)
+        raw = await request.read()
+        front.dispatch(loads(raw), raw)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(config.WEBHOOK_PATH, handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, config.WEBAPP_HOST, config.WEBAPP_PORT).start()
+
+    url = config.WEBHOOK_BASE_URL.rstrip("/") + config.WEBHOOK_PATH
+    await bot.set_webhook(
+        url,
+        secret_token=config.WEBHOOK_SECRET,
+        allowed_updates=allowed_updates,
+        drop_pending_updates=config.DROP_PENDING_UPDATES,
+    )
+    log.info("Webhook set to %s, front listening on %s:%d", url, config.WEBAPP_HOST, config.WEBAPP_PORT)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_front(workers: int | None = None) -> None:
+    """Запускает воркеры и принимает апдейты до отмены."""
+    workers = workers or config.WORKERS
+    front = Front(workers)
+    front.start()
+    log.info("Started %d workers, DB pool %d each", workers, pool_share(workers))
+
+    bot = services.create_bot()
+    # Диспетчер фронта нужен только чтобы узнать, какие типы апдейтов запрашивать
+    probe = Dispatcher()
+    for r in routers:
+        probe.include_router(r)
+    allowed = probe.resolve_used_update_types()
+    receive = _serve_webhook if config.RUN_MODE == "webhook" else _poll
+    tasks = [
+        asyncio.create_task(receive(front, bot, allowed)),
+        asyncio.create_task(front.supervise()),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for t in done:
+            t.result()  # ошибка приёма или воркер, который не удаётся поднять
+    except asyncio.CancelledError:
+        pass
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await bot.session.close()
+        await asyncio.get_running_loop().run_in_executor(None, front.stop)
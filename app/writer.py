@@ -0,0 +1,123 @@
+"""
+Отложенная (write-behind) запись пользователей и интересов.
+
+Обработчики только кладут запись в буфер в памяти и сразу отвечают.
+Фоновая задача сбрасывает буфер раз в WRITER_FLUSH_MS миллисекунд
+или сразу при накоплении WRITER_MAX_ROWS строк — одной командой
+INSERT ... SELECT FROM unnest(...) ON CONFLICT на каждую таблицу.
+Повторы одного ключа схлопываются ещё в буфере. При остановке бота
+буфер сбрасывается до закрытия пула. Глубина очереди — метрика
+bot_writer_queue_rows.
+"""
+from __future__ import annotations
+
+import asyncio, logging
+from datetime import datetime, timezone
+
+from . import config, metrics, models
+
+log = logging.getLogger(__name__)
+
+_users: dict[int, tuple[str | None, str | None]] = {}   # telegram_id → (username, first_name)
+_interests: dict[tuple[int, int], datetime] = {}        # (user_id, phone_id) → added_at
+_wake = asyncio.Event()
+_task: asyncio.Task | None = None
+_stopping = False
+
+
+def save_user(tg_id: int, username: str | None, first: str | None) -> None:
+    """Поставить пользователя в очередь на запись (см. models.save_user)."""
+    _users[tg_id] = (username, first)
+    _check_size()
+
+
+def add_user_phone(user_id: int, phone_id: str | int) -> None:
+    """Поставить интерес к телефону в очередь на запись (см. models.add_user_phone)."""
+    _interests[(user_id, int(phone_id))] = datetime.now(timezone.utc)
+    _check_size()
+
+
+def depth() -> int:
+    """Сколько строк ждёт записи."""
+    return len(_users) + len(_interests)
+
+
+WRITER_QUEUE = metrics.Gauge(
+    "bot_writer_queue_rows", "Rows waiting for write-behind flush", ("table",),
+    collect=lambda: {("users",): len(_users), ("user_phones",): len(_interests)},
+)
+
+
+def _check_size() -> None:
+    if depth() >= config.WRITER_MAX_ROWS:
+        _wake.set()
+
+
+def start() -> None:
+    """Запускает фоновый сброс буфера."""
+    global _task, _stopping
+    _stopping = False
+    _task = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    """
+    Останавливает фоновую задачу и записывает остаток буфера.
+    Задача не отменяется, а дорабатывает текущий сброс: отмена посреди
+    flush() потеряла бы уже вынутую из буфера пачку.
+    """
+    global _task, _stopping
+    _stopping = True
+    _wake.set()
+    if _task:
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+    try:
+        await flush()
+    except Exception:
+        log.exception("Final write-behind flush failed, %d rows lost", depth())
+
+
+async def _run() -> None:
+    while not _stopping:
+        try:
+            await asyncio.wait_for(_wake.wait(), config.WRITER_FLUSH_MS / 1000)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+        try:
+            await flush()
+        except Exception:
+            log.exception("Write-behind flush failed, queue depth=%d", depth())
+
+
+async def flush() -> None:
+    """
+    Записывает всё накопленное. При ошибке (и при отмене задачи) строки
+    возвращаются в буфер.
+    """
+    global _users, _interests
+    users, _users = _users, {}
+    interests, _interests = _interests, {}
+
+    if users:
+        try:
+            ids = list(users)
+            await models.save_users(ids, [u[0] for u in users.values()], [u[1] for u in users.values()])
+        except BaseException:
+            _users = {**users, **_users}            # новые данные важнее
+            _interests = {**interests, **_interests}
+            raise
+
+    if interests:
+        try:
+            keys = list(interests)
+            await models.add_user_phones(
+                [k[0] for k in keys], [k[1] for k in keys], list(interests.values()),
+            )
+        except BaseException:
+            _interests = {**interests, **_interests}
+            raise
+
+    if users or interests:
+        log.debug("Flushed %d users, %d interests; queue depth=%d", len(users), len(interests), depth())
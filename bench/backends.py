@@ -0,0 +1,166 @@
+"""
+Хранилища для бенчмарков: в памяти или локальный PostgreSQL.
+
+MemoryBackend подменяет функции app.models, которые вызывают обработчики
+и фоновые исполнители, и кладёт готовый снимок в app.catalog. Так
+измеряется стоимость самого бота (диспетчер, роутеры, FSM, клавиатуры)
+без сети до БД. PostgresBackend поднимает настоящий пул и кэш каталога:
+заказы в нём резервируют товар, поэтому нужна отдельная, не боевая база.
+"""
+from __future__ import annotations
+
+import itertools
+
+from app import catalog, config, db, known_users, migrate, models
+
+MODELS = ["iPhone 13", "iPhone 14", "iPhone 15", "iPhone 15 Pro", "iPhone 16", "iPhone 16 Pro"]
+STORAGES = [128, 256, 512]
+COLORS = ["Black", "White", "Blue", "Pink"]
+
+
+def sample_phones(quantity: int = 1_000_000) -> list[dict]:
+    """Синтетический каталог: все сочетания модели, памяти и цвета."""
+    phones = []
+    for i, (model, storage, color) in enumerate(itertools.product(MODELS, STORAGES, COLORS), 1):
+        phones.append({
+            "id": i, "model": model, "storage": storage, "color": color,
+            "price": 50_000 + 10_000 * MODELS.index(model) + 100 * storage,
+            "quantity": quantity, "sort_idx": len(MODELS) - MODELS.index(model), "photo": None,
+        })
+    return phones
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, phones: list[dict] | None = None):
+        self.phones = {p["id"]: p for p in (phones or sample_phones())}
+        self.users: dict[int, tuple] = {}
+        self.interests: set[tuple[int, int]] = set()
+        self.orders: list[tuple] = []
+        self.jobs: dict[int, dict] = {}
+        self.recipients: dict[int, list[int]] = {}
+        self.audience: list[int] = []  # получатели рассылки «всем»
+        self._saved: dict[str, object] = {}
+
+    async def start(self) -> None:
+        fakes = {
+            "save_users": self.save_users,
+            "add_user_phones": self.add_user_phones,
+            "get_phone": self.get_phone,
+            "get_phone_by_attrs": self.get_phone_by_attrs,
+            "create_order": self.create_order,
+            "create_broadcast_job": self.create_broadcast_job,
+            "next_broadcast_job": self.next_broadcast_job,
+            "iter_pending_recipients": self.iter_pending_recipients,
+            "checkpoint_broadcast": self.checkpoint_broadcast,
+            "finish_broadcast_job": self.finish_broadcast_job,
+            "release_broadcast_job": self.release_broadcast_job,
+            "mark_users_inactive": self.mark_users_inactive,
+        }
+        for name, fake in fakes.items():
+            self._saved[name] = getattr(models, name)
+            setattr(models, name, fake)
+        self._saved["CATALOG_TTL"] = config.CATALOG_TTL
+        config.CATALOG_TTL = float("inf")  # слушателя NOTIFY нет, снимок не устаревает
+        in_stock = sorted(
+            (p for p in self.phones.values() if p["quantity"] > 0),
+            key=lambda p: (-p["sort_idx"], p["price"]),
+        )
+        catalog._snapshot = catalog.Snapshot(in_stock, version=1)
+        known_users.preload(self.users)  # повторный /start — без записи, как в боте
+
+    async def stop(self) -> None:
+        await known_users.stop()
+        config.CATALOG_TTL = self._saved.pop("CATALOG_TTL")
+        for name, original in self._saved.items():
+            setattr(models, name, original)
+        self._saved.clear()
+        catalog._snapshot = None
+
+    # ───── app.models ─────
+
+    async def save_users(self, tg_ids, usernames, firsts) -> None:
+        self.users.update(zip(tg_ids, zip(usernames, firsts)))
+
+    async def add_user_phones(self, user_ids, phone_ids, added) -> None:
+        self.interests.update(zip(user_ids, phone_ids))
+
+    async def get_phone(self, phone_id):
+        return self.phones.get(int(phone_id))
+
+    async def get_phone_by_attrs(self, model, storage, color):
+        return next(
+            (p for p in self.phones.values()
+             if (p["model"], p["storage"], p["color"]) == (model, storage, color)),
+            None,
+        )
+
+    async def create_order(self, user_id, user_name, phone_id, notify, hold=None):
+        phone = self.phones.get(phone_id)
+        if phone is None or phone["quantity"] <= 0:
+            return None
+        phone["quantity"] -= 1
+        self.orders.append((user_id, phone_id, tuple(notify)))
+        return len(self.orders)
+
+    async def create_broadcast_job(self, author_id, text, photo, models=None):
+        job_id = len(self.jobs) + 1
+        self.recipients[job_id] = list(self.audience)
+        self.jobs[job_id] = {
+            "id": job_id, "author_id": author_id, "text": text, "photo": photo,
+            "status": "pending", "total": len(self.audience), "sent": 0, "failed": 0,
+        }
+        return job_id, len(self.audience)
+
+    async def next_broadcast_job(self, owner, lease):
+        for job in self.jobs.values():
+            if job["status"] in ("running", "pending"):
+                job["status"] = "running"
+                return dict(job)
+        return None
+
+    async def iter_pending_recipients(self, job_id, batch_size=models.CURSOR_BATCH):
+        for user_id in self.recipients[job_id]:
+            yield user_id
+
+    async def checkpoint_broadcast(self, job_id, user_ids, statuses, owner, lease):
+        job = self.jobs[job_id]
+        job["sent"] += sum(1 for s in statuses if s == models.RCPT_SENT)
+        job["failed"] += sum(1 for s in statuses if s >= models.RCPT_FAILED)
+        return job["status"]
+
+    async def finish_broadcast_job(self, job_id, owner):
+        job = self.jobs[job_id]
+        if job["status"] != "running":
+            return None
+        job["status"] = "done"
+        return dict(job)
+
+    async def release_broadcast_job(self, job_id, owner) -> None:
+        pass
+
+    async def mark_users_inactive(self, user_ids, reasons) -> None:
+        pass
+
+
+class PostgresBackend:
+    """Настоящая база по config.DATABASE_URL (миграции применяются автоматически)."""
+    name = "postgres"
+
+    def __init__(self):
+        self.audience: list[int] = []  # не используется: аудитория берётся из users
+
+    async def start(self) -> None:
+        await migrate.run()
+        await db.connect()
+        await catalog.start()
+        await known_users.start()
+
+    async def stop(self) -> None:
+        await known_users.stop()
+        await catalog.stop()
+        await db.close()
+
+
+BACKENDS = {b.name: b for b in (MemoryBackend, PostgresBackend)}
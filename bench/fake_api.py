@@ -0,0 +1,77 @@
+"""
+Локальный фейковый сервер Bot API для бенчмарков.
+
+Отвечает на POST /bot<token>/<method> правдоподобными объектами
+(Message, True, User) и считает вызовы по методам. latency — искусственная
+задержка ответа в секундах, чтобы приблизиться к реальной сети.
+"""
+from __future__ import annotations
+
+import asyncio, itertools, time
+from collections import Counter
+
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+# Методы, которые возвращают True, а не Message
+_TRUE_METHODS = {
+    "answercallbackquery", "deletemessage", "deletewebhook", "setwebhook",
+    "setmycommands", "sendchataction",
+}
+
+
+class FakeBotAPI:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._ids = itertools.count(1_000_000)
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]  # если порт выбирала ОС
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    def reset(self) -> None:
+        self.calls.clear()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        self.calls[method] += 1
+        fields = await request.post()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"ok": True, "result": self._result(method, fields)})
+
+    def _result(self, method: str, fields):
+        if method in _TRUE_METHODS:
+            return True
+        if method == "getme":
+            return BOT_USER
+        message = {
+            "message_id": int(fields.get("message_id") or next(self._ids)),
+            "date": int(time.time()),
+            "chat": {"id": int(fields.get("chat_id") or 0), "type": "private"},
+            "from": BOT_USER,
+        }
+        if method == "sendphoto":
+            message["photo"] = [{"file_id": "bench", "file_unique_id": "bench", "width": 1, "height": 1}]
+            message["caption"] = fields.get("caption", "")
+        else:
+            message["text"] = fields.get("text", "")
+        return message
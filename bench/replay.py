@@ -0,0 +1,136 @@
+"""
+Воспроизведение записанного трафика (RECORD_UPDATES, см. app/middlewares/recording.py)
+через диспетчер с фейковым Bot API и хранилищем из bench/backends.py.
+
+    python -m bench.replay updates.ndjson.gz                   # в реальном темпе
+    python -m bench.replay updates.*.ndjson --speed 10         # в 10 раз быстрее
+    python -m bench.replay updates.ndjson --speed max --phones phones.json
+
+Интервалы между апдейтами сохраняются (делятся на --speed), апдейты
+одного пользователя обрабатываются по очереди, как в боевом боте.
+Задержка апдейта считается от момента, когда он «пришёл», до конца
+обработки — с учётом ожидания предыдущих апдейтов того же пользователя.
+Для in-memory хранилища каталог можно взять из JSON-выгрузки phones
+(--phones), чтобы id и модели в записанных callback_data совпадали.
+"""
+from __future__ import annotations
+
+import argparse, asyncio, gzip, json, pathlib, time
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from app import runtime
+from app.sharding import shard_key
+
+from .backends import BACKENDS, MemoryBackend
+from .run import compare, environment, meta, print_summary, save
+from .scenarios import Result
+
+
+def load(paths: list[pathlib.Path]) -> list[tuple[float, dict]]:
+    """Записи из всех файлов (например, по одному на воркер), по времени."""
+    entries = []
+    for path in paths:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    entries.append((item["t"], item["update"]))
+    entries.sort(key=lambda e: e[0])
+    return entries
+
+
+async def replay(
+    dp: Dispatcher,
+    bot: Bot,
+    entries: list[tuple[float, dict]],
+    speed: float | None,
+    concurrency: int,
+) -> Result:
+    """speed=None — без пауз, так быстро, как успевает бот."""
+    result = Result()
+    gate = asyncio.Semaphore(concurrency)
+    tails: dict[int, asyncio.Task] = {}
+
+    async def process(prev: asyncio.Task | None, data: dict, arrived: float) -> None:
+        if prev is not None:
+            await asyncio.wait([prev])
+        async with gate:
+            try:
+                await dp.feed_update(bot, Update.model_validate(data, context={"bot": bot}))
+            except Exception:
+                result.errors += 1
+        result.latencies.append(time.perf_counter() - arrived)
+        result.updates += 1
+
+    t0 = entries[0][0] if entries else 0.0
+    started = time.perf_counter()
+    lag = 0.0  # насколько подача отставала от расписания записи
+    for t, data in entries:
+        if speed:
+            due = started + (t - t0) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                lag = max(lag, -delay)
+        key = shard_key(data)
+        task = asyncio.create_task(process(tails.get(key), data, time.perf_counter()))
+        tails[key] = task
+        task.add_done_callback(lambda t, k=key: tails.pop(k) if tails.get(k) is t else None)
+    if tails:
+        await asyncio.wait(list(tails.values()))
+    result.seconds = time.perf_counter() - started
+    result.extra = {"max_schedule_lag_ms": round(lag * 1000, 1)}
+    return result
+
+
+async def run(args) -> dict:
+    entries = load(args.files)
+    if args.backend == "memory" and args.phones:
+        backend = MemoryBackend(json.loads(args.phones.read_text(encoding="utf-8")))
+    else:
+        backend = BACKENDS[args.backend]()
+    speed = None if args.speed == "max" else float(args.speed)
+
+    async with environment(backend, args.api_latency) as (api, bot, dp):
+        res = await replay(dp, bot, entries, speed, args.concurrency)
+        summary = res.summary()
+        summary["api_calls"] = dict(api.calls)
+    name = f"replay@{args.speed}"
+    print_summary(name, summary)
+    return {
+        "meta": meta(
+            backend=args.backend,
+            files=[str(p) for p in args.files],
+            speed=args.speed,
+            concurrency=args.concurrency,
+            api_latency_ms=args.api_latency,
+        ),
+        "results": {name: summary},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Воспроизведение записанных апдейтов")
+    parser.add_argument("files", nargs="+", type=pathlib.Path, help="NDJSON-записи (.gz — сжатые)")
+    parser.add_argument("--speed", default="1", help="ускорение: 1, 10, ... или max")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="memory")
+    parser.add_argument("--phones", type=pathlib.Path, help="JSON-выгрузка phones для memory")
+    parser.add_argument("--concurrency", type=int, default=1000, help="апдейтов в обработке одновременно")
+    parser.add_argument("--api-latency", type=float, default=0, help="задержка фейкового Bot API, мс")
+    parser.add_argument("--out", type=pathlib.Path, help="куда сохранить результаты")
+    parser.add_argument("--compare", type=pathlib.Path, help="прошлый прогон для сравнения")
+    args = parser.parse_args()
+
+    runtime.install()
+    report = asyncio.run(run(args))
+    save(report, args.out, f"replay-{args.backend}")
+    if args.compare:
+        compare(json.loads(args.compare.read_text(encoding="utf-8")), report)
+
+
+if __name__ == "__main__":
+    main()
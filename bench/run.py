@@ -0,0 +1,156 @@
+"""
+Офлайн-бенчмарк бота: диспетчер со всеми роутерами, фейковый Bot API,
+хранилище в памяти или локальный PostgreSQL.
+
+    python -m bench.run                                  # всё, в памяти
+    python -m bench.run --backend postgres --users 500   # DATABASE_URL
+    python -m bench.run --compare bench/results/old.json # сравнить с прошлым прогоном
+
+Результаты сохраняются в bench/results/<backend>-<время>.json.
+"""
+from __future__ import annotations
+
+import argparse, asyncio, json, pathlib, platform, subprocess, time
+from contextlib import asynccontextmanager
+
+from aiogram.client.telegram import TelegramAPIServer
+
+from app import config, runtime, services, writer
+
+from . import scenarios
+from .backends import BACKENDS
+from .fake_api import FakeBotAPI
+
+RESULTS_DIR = pathlib.Path(__file__).parent / "results"
+SCENARIOS = ("start", "wizard", "broadcast")
+# Что сравнивать и в какую сторону лучше
+METRICS = {"updates_per_sec": +1, "messages_per_sec": +1, "p50_ms": -1, "p99_ms": -1}
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+@asynccontextmanager
+async def environment(backend, api_latency: float = 0, broadcast_rate: float = 100_000):
+    """
+    Фейковый Bot API, хранилище, бот и диспетчер со всеми роутерами.
+    Отдаёт (api, bot, dp); всё останавливается на выходе.
+    """
+    # Рассылку меряем без лимитов Telegram; токен никогда не уходит наружу
+    config.BOT_TOKEN = "42:BENCH"
+    config.BROADCAST_RATE = broadcast_rate
+    config.BROADCAST_CHAT_INTERVAL = 0
+
+    api = FakeBotAPI(latency=api_latency / 1000)
+    await api.start()
+    await backend.start()
+    writer.start()
+
+    session = runtime.session(api=TelegramAPIServer.from_base(api.url))
+    bot = services.create_bot(session=session)
+    dp = services.create_dispatcher()
+    try:
+        yield api, bot, dp
+    finally:
+        await writer.stop()
+        await dp.storage.close()
+        await bot.session.close()
+        await backend.stop()
+        await api.stop()
+
+
+def meta(**fields) -> dict:
+    return {
+        **fields,
+        "git": _git_rev(),
+        "python": platform.python_version(),
+        "runtime": runtime.describe(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save(report: dict, out: pathlib.Path | None, prefix: str) -> pathlib.Path:
+    out = out or RESULTS_DIR / f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nSaved to {out}")
+    return out
+
+
+def print_summary(name: str, summary: dict) -> None:
+    print(f"{name:<10} " + "  ".join(f"{k}={v}" for k, v in summary.items() if k != "api_calls"))
+
+
+async def run(args) -> dict:
+    backend = BACKENDS[args.backend]()
+    backend.audience = list(range(3_000_000, 3_000_000 + args.recipients))
+
+    results = {}
+    async with environment(backend, args.api_latency, args.broadcast_rate) as (api, bot, dp):
+        for name in args.scenarios:
+            api.reset()
+            if name == "start":
+                res = await scenarios.start_storm(dp, bot, args.users, args.concurrency)
+            elif name == "wizard":
+                res = await scenarios.wizard(dp, bot, args.users, args.concurrency)
+            else:
+                res = await scenarios.broadcast_all(dp, bot, backend.audience)
+            summary = res.summary()
+            summary["api_calls"] = dict(api.calls)
+            results[name] = summary
+            print_summary(name, summary)
+
+    return {
+        "meta": meta(
+            backend=args.backend,
+            users=args.users,
+            recipients=args.recipients,
+            concurrency=args.concurrency,
+            api_latency_ms=args.api_latency,
+        ),
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict) -> None:
+    """Печатает изменения ключевых метрик относительно прошлого прогона."""
+    print(f"\nvs {old['meta'].get('git')} ({old['meta'].get('time')}):")
+    for name, cur in new["results"].items():
+        prev = old["results"].get(name)
+        if not prev:
+            continue
+        for metric, better in METRICS.items():
+            if metric not in cur or not prev.get(metric):
+                continue
+            change = (cur[metric] - prev[metric]) / prev[metric] * 100
+            mark = "✓" if change * better >= 0 else "✗"
+            print(f"  {name:<10} {metric:<16} {prev[metric]:>10} → {cur[metric]:<10} {change:+6.1f}% {mark}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк диспетчера и роутеров")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="memory")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=1000, help="пользователей в /start и мастере")
+    parser.add_argument("--recipients", type=int, default=5000, help="получателей рассылки (memory)")
+    parser.add_argument("--concurrency", type=int, default=100, help="пользователей одновременно")
+    parser.add_argument("--api-latency", type=float, default=0, help="задержка фейкового Bot API, мс")
+    parser.add_argument("--broadcast-rate", type=float, default=100_000, help="BROADCAST_RATE на время прогона")
+    parser.add_argument("--out", type=pathlib.Path, help="куда сохранить результаты")
+    parser.add_argument("--compare", type=pathlib.Path, help="прошлый прогон для сравнения")
+    args = parser.parse_args()
+
+    runtime.install()  # FAST_RUNTIME=1 — uvloop, как в app/main.py
+    report = asyncio.run(run(args))
+    save(report, args.out, args.backend)
+
+    if args.compare:
+        compare(json.loads(args.compare.read_text(encoding="utf-8")), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Сравнение обычного и быстрого режима (FAST_RUNTIME, см. app/runtime.py)
+на сценариях мастера каталога и рассылки.
+
+Каждый режим запускается отдельным процессом python -m bench.run:
+политику event loop нужно ставить до его создания.
+
+    python -m bench.runtime_compare --users 2000 --recipients 20000
+"""
+from __future__ import annotations
+
+import argparse, json, os, pathlib, subprocess, sys, tempfile
+
+from .run import compare
+
+MODES = {"standard": "0", "fast": "1"}
+
+
+def run_mode(fast: str, args, out: pathlib.Path) -> dict:
+    env = {**os.environ, "FAST_RUNTIME": fast}
+    cmd = [
+        sys.executable, "-m", "bench.run",
+        "--backend", args.backend,
+        "--scenarios", "wizard", "broadcast",
+        "--users", str(args.users),
+        "--recipients", str(args.recipients),
+        "--concurrency", str(args.concurrency),
+        "--out", str(out),
+    ]
+    subprocess.run(cmd, env=env, check=True)
+    return json.loads(out.read_text(encoding="utf-8"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Обычный режим против FAST_RUNTIME")
+    parser.add_argument("--backend", default="memory")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--recipients", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reports = {}
+        for mode, fast in MODES.items():
+            print(f"── {mode} ──")
+            reports[mode] = run_mode(fast, args, pathlib.Path(tmp) / f"{mode}.json")
+
+    print(f"\nstandard: {reports['standard']['meta']['runtime']}")
+    print(f"fast:     {reports['fast']['meta']['runtime']}")
+    compare(reports["standard"], reports["fast"])
+
+
+if __name__ == "__main__":
+    main()
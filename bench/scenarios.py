@@ -0,0 +1,170 @@
+"""
+Сценарии нагрузки: синтетические Update'ы через настоящий Dispatcher.
+
+Каждый сценарий — набор «потоков» апдейтов: апдейты одного пользователя
+идут строго по очереди (как их видит бот), разные пользователи —
+параллельно, не больше concurrency одновременно. Время каждого
+dp.feed_update попадает в выборку задержек.
+"""
+from __future__ import annotations
+
+import asyncio, itertools, time
+from dataclasses import dataclass, field
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from app import broadcast_worker, catalog, config, models
+from app.handlers import broadcast
+
+from .fake_api import BOT_USER
+
+ADMIN_ID = 777
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+@dataclass
+class Result:
+    updates: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    extra: dict = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        lat = sorted(self.latencies)
+
+        def pct(q: float) -> float:
+            return round(lat[int(q * (len(lat) - 1))] * 1000, 3) if lat else 0.0
+
+        return {
+            "updates": self.updates,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "updates_per_sec": round(self.updates / self.seconds, 1) if self.seconds else 0.0,
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            **self.extra,
+        }
+
+
+# ───────────── Синтетические апдейты ─────────────
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "username": f"u{user_id}"}
+
+
+def message(bot: Bot, user_id: int, text: str) -> Update:
+    return Update.model_validate({
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": text,
+        },
+    }, context={"bot": bot})
+
+
+def callback(bot: Bot, user_id: int, data: str, message_id: int) -> Update:
+    return Update.model_validate({
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "…",
+            },
+        },
+    }, context={"bot": bot})
+
+
+# ───────────── Прогон ─────────────
+
+async def drive(dp: Dispatcher, bot: Bot, flows: list[list[Update]], concurrency: int) -> Result:
+    """Прогоняет потоки апдейтов и собирает задержки."""
+    result = Result()
+    gate = asyncio.Semaphore(concurrency)
+
+    async def run_flow(flow: list[Update]) -> None:
+        async with gate:
+            for update in flow:
+                started = time.perf_counter()
+                try:
+                    await dp.feed_update(bot, update)
+                except Exception:
+                    result.errors += 1
+                result.latencies.append(time.perf_counter() - started)
+                result.updates += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_flow(f) for f in flows))
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+async def start_storm(dp: Dispatcher, bot: Bot, users: int, concurrency: int) -> Result:
+    """/start от users пользователей, каждый дважды: первый раз — новый, второй — известный."""
+    ids = range(1_000_000, 1_000_000 + users)
+    flows = [[message(bot, uid, "/start"), message(bot, uid, "/start")] for uid in ids]
+    return await drive(dp, bot, flows, concurrency)
+
+
+async def wizard(dp: Dispatcher, bot: Bot, users: int, concurrency: int) -> Result:
+    """Полный проход мастера: каталог → модель → память → цвет → «Этот хочу»."""
+    snap = await catalog.get()
+    flows = []
+    for i in range(users):
+        uid = 2_000_000 + i
+        model = snap.models[i % len(snap.models)]
+        storages = snap.storages_for(model)
+        storage = storages[i % len(storages)]
+        colors = snap.colors_for(model, storage)
+        color = colors[i % len(colors)]
+        phone = snap.phone(model, storage, color)
+        mid = next(_message_ids)
+        flows.append([
+            callback(bot, uid, "show_catalog", mid),
+            callback(bot, uid, f"model:{model}", mid),
+            callback(bot, uid, f"storage:{storage}", mid),
+            callback(bot, uid, f"color:{color}", mid),
+            callback(bot, uid, f"buy:{phone['id']}", next(_message_ids)),
+        ])
+    return await drive(dp, bot, flows, concurrency)
+
+
+async def broadcast_all(dp: Dispatcher, bot: Bot, recipients: list[int]) -> Result:
+    """
+    Админ проходит диалог /broadcast до «Отправить», затем задание
+    выполняется исполнителем рассылок. Задержки — по апдейтам диалога,
+    messages_per_sec — по самой рассылке.
+    """
+    broadcast.ADMINS.add(ADMIN_ID)
+    mid = next(_message_ids)
+    flow = [
+        message(bot, ADMIN_ID, "/broadcast"),
+        callback(bot, ADMIN_ID, "aud:all", mid),
+        message(bot, ADMIN_ID, "Bench broadcast"),
+        message(bot, ADMIN_ID, "/skip"),
+        callback(bot, ADMIN_ID, "bc:send", mid),
+    ]
+    result = await drive(dp, bot, [flow], 1)
+
+    job = await models.next_broadcast_job(broadcast_worker.OWNER, config.BROADCAST_LEASE)
+    started = time.perf_counter()
+    await broadcast_worker._process(bot, job)
+    elapsed = time.perf_counter() - started
+    result.extra = {
+        "recipients": job["total"],
+        "broadcast_seconds": round(elapsed, 3),
+        "messages_per_sec": round(job["total"] / elapsed, 1) if elapsed else 0.0,
+    }
+    return result
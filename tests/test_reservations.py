@@ -0,0 +1,82 @@
+"""
+Резервирование товара под конкуренцией (models.create_order / expire_reservations).
+
+Нужен PostgreSQL: DATABASE_URL=postgresql://... python -m pytest tests
+Без DATABASE_URL тест пропускается. Схема создаётся во временной
+PostgreSQL-схеме и удаляется после теста, боевые таблицы не затрагиваются.
+"""
+from __future__ import annotations
+
+import asyncio, os, uuid
+from urllib.parse import urlencode, urlsplit, urlunsplit, parse_qsl
+
+import asyncpg
+import pytest
+
+from app import config, db, migrate, models
+
+BUYERS = 500
+STOCK = 10
+MANAGER = 1  # фиктивный получатель уведомлений
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="DATABASE_URL is not set")
+
+
+def _with_search_path(dsn: str, schema: str) -> str:
+    """DSN, у соединений которого search_path — только временная схема."""
+    parts = urlsplit(dsn)
+    query = dict(parse_qsl(parts.query), search_path=schema)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+async def _scenario(dsn: str) -> None:
+    await migrate.run(dsn)
+    config.DATABASE_URL = dsn
+    await db.connect()
+    try:
+        phone_id = await db.pool.fetchval(
+            "INSERT INTO phones (model, storage, color, price, quantity)"
+            " VALUES ('test-reservations', 128, 'test', 1, $1) RETURNING id",
+            STOCK,
+        )
+        results = await asyncio.gather(*(
+            models.create_order(10_000 + i, f"buyer {i}", phone_id, [MANAGER])
+            for i in range(BUYERS)
+        ))
+        orders = [r for r in results if r is not None]
+        left = await db.pool.fetchval("SELECT quantity FROM phones WHERE id = $1", phone_id)
+        queued = await db.pool.fetchval(
+            "SELECT count(*) FROM order_outbox WHERE order_id = ANY($1::bigint[])", orders
+        )
+        assert len(orders) == STOCK, "oversold or undersold"
+        assert left == 0, "stock out of sync with orders"
+        assert queued == len(orders), "notifications out of sync with orders"
+
+        await db.pool.execute(
+            "UPDATE orders SET reserved_until = NOW() - INTERVAL '1 second'"
+            " WHERE id = ANY($1::bigint[])", orders,
+        )
+        expired = await models.expire_reservations(phone_id=phone_id)
+        left = await db.pool.fetchval("SELECT quantity FROM phones WHERE id = $1", phone_id)
+        assert sorted(expired) == sorted(orders)
+        assert left == STOCK, "expired reservations did not restore stock"
+    finally:
+        await db.close()
+
+
+def test_concurrent_orders_never_oversell(monkeypatch):
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    monkeypatch.setattr(config, "DATABASE_URL", DATABASE_URL)
+
+    async def run() -> None:
+        admin = await asyncpg.connect(DATABASE_URL)
+        await admin.execute(f'CREATE SCHEMA "{schema}"')
+        try:
+            await _scenario(_with_search_path(DATABASE_URL, schema))
+        finally:
+            await admin.execute(f'DROP SCHEMA "{schema}" CASCADE')
+            await admin.close()
+
+    asyncio.run(run())